@@ -0,0 +1,140 @@
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from helper import atomic_write
+
+
+class ChipStore:
+    """
+    Orthomosaic tiles cut once into memory-mapped stores so tiles are read as
+    zero-copy array views instead of being cropped from the orthomosaic on
+    every call. In store_dir:
+
+        index.npy:  (rows, cols) chip id of each tile of the tile file, -1 if none
+        chips.npy:  (N, H, W, 3) uint8 chips, padded to the largest tile
+        shapes.npy: (N, 2) (height, width) of each chip
+        chips_alt{altitude:.2f}.npy / shapes_alt{altitude:.2f}.npy:
+                    optional pre-degraded chips at an altitude
+
+    Args:
+        store_dir: directory written by build().
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.index = np.load(os.path.join(store_dir, "index.npy"))
+        self.chips = np.load(os.path.join(store_dir, "chips.npy"), mmap_mode="r")
+        self.shapes = np.load(os.path.join(store_dir, "shapes.npy"))
+        self.degraded = {}
+        for filename in os.listdir(store_dir):
+            if filename.startswith("shapes_alt") and filename.endswith(".npy"):
+                self._load_altitude(float(filename[len("shapes_alt") : -len(".npy")]))
+
+    @staticmethod
+    def _paths(store_dir, altitude):
+        return (
+            os.path.join(store_dir, f"chips_alt{altitude:.2f}.npy"),
+            os.path.join(store_dir, f"shapes_alt{altitude:.2f}.npy"),
+        )
+
+    def _load_altitude(self, altitude):
+        chips_path, shapes_path = self._paths(self.store_dir, altitude)
+        self.degraded[round(altitude, 2)] = (
+            np.load(chips_path, mmap_mode="r"),
+            np.load(shapes_path),
+        )
+
+    @staticmethod
+    def _write(path, chips, shape):
+        """
+        Write the (height, width, 3) chips to an (N, H, W, 3) .npy, the file
+        appearing only once complete. Returns the (N, 2) chip shapes, which
+        are saved after it so that a store with shapes is always complete.
+        """
+        with atomic_write(path) as tmp_path:
+            store = open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=shape)
+            shapes = np.zeros((shape[0], 2), dtype=np.int32)
+            for chip_id, chip in enumerate(chips):
+                h, w = chip.shape[:2]
+                store[chip_id, :h, :w] = chip
+                shapes[chip_id] = h, w
+            store.flush()
+            del store
+        return shapes
+
+    @classmethod
+    def build(cls, store_dir, img, tile_pixel_loc, altitudes=(), img_at_alt=None):
+        """
+        Cut every tile of tile_pixel_loc (the parsed tile file) out of img
+        (anything indexable as img[rows, cols, :], e.g. an OrthomapReader) and,
+        if img_at_alt(chip, altitude) is given, the chips degraded to each of
+        altitudes. Altitudes already in the store are kept.
+        """
+        os.makedirs(store_dir, exist_ok=True)
+        index_path = os.path.join(store_dir, "index.npy")
+        chips_path = os.path.join(store_dir, "chips.npy")
+        shapes_path = os.path.join(store_dir, "shapes.npy")
+
+        tiles = [
+            (row, col)
+            for row in range(tile_pixel_loc.shape[0])
+            for col in range(tile_pixel_loc.shape[1])
+            if tile_pixel_loc[row][col] is not None
+        ]
+        if not os.path.exists(index_path):
+            index = np.full(tile_pixel_loc.shape, -1, dtype=np.int32)
+            height = width = 0
+            for chip_id, (row, col) in enumerate(tiles):
+                (x0, x1), (y0, y1) = tile_pixel_loc[row][col]
+                index[row, col] = chip_id
+                height, width = max(height, x1 - x0), max(width, y1 - y0)
+
+            def chips():
+                for row, col in tiles:
+                    (x0, x1), (y0, y1) = tile_pixel_loc[row][col]
+                    yield img[slice(x0, x1), slice(y0, y1), :]
+
+            shapes = cls._write(chips_path, chips(), (len(tiles), height, width, 3))
+            np.save(shapes_path, shapes)
+            np.save(index_path, index)
+
+        store = cls(store_dir)
+        if img_at_alt is None:
+            return store
+        for altitude in altitudes:
+            if round(altitude, 2) in store.degraded:
+                continue
+            # degrading only shrinks chips: same padded shape as the originals
+            degraded = (
+                np.asarray(img_at_alt(store.chip(tile), altitude)) for tile in tiles
+            )
+            chips_path, shapes_path = cls._paths(store_dir, altitude)
+            shapes = cls._write(chips_path, degraded, store.chips.shape)
+            np.save(shapes_path, shapes)
+            store._load_altitude(altitude)
+        return store
+
+    def __len__(self):
+        return len(self.chips)
+
+    def chip_id(self, tile):
+        chip_id = int(self.index[tile[0], tile[1]])
+        if chip_id < 0:
+            raise KeyError(f"No chip for tile {tile}")
+        return chip_id
+
+    def chip(self, tile, altitude=None):
+        """
+        (height, width, 3) view of the chip of tile (row, col of the tile
+        file), pre-degraded to altitude if given (None if not in the store).
+        """
+        chips, shapes = self.chips, self.shapes
+        if altitude is not None:
+            if round(altitude, 2) not in self.degraded:
+                return None
+            chips, shapes = self.degraded[round(altitude, 2)]
+        chip_id = self.chip_id(tile)
+        h, w = shapes[chip_id]
+        return chips[chip_id, :h, :w]
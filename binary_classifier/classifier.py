@@ -1,3 +1,7 @@
+import copy
+import os
+import time
+
 import numpy as np
 import torch
 
@@ -20,30 +24,102 @@ import torch
 model_path = "/home/bota/Desktop/active_sensing/binary_classifier/models/best_model_auc91_lr1_-05_bs128_wd_2.5-04.pth"
 
 
+def quantized_engine():
+    """
+    int8 kernels to use: x86 (or fbgemm on older torch) if available, else
+    qnnpack (ARM).
+    """
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in torch.backends.quantized.supported_engines:
+            return engine
+    raise RuntimeError("No quantized engine available in this torch build.")
+
+
+class OnnxModel:
+    """
+    ONNX Runtime session (CPU execution provider) called like the torch
+    model: (N, 3, H, W) float tensor in, output logits tensor out.
+    """
+
+    def __init__(self, path, num_threads=None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, data):
+        data = data.detach().cpu().numpy().astype(np.float32, copy=False)
+        return torch.from_numpy(self.session.run(None, {self.input_name: data})[0])
+
+    def eval(self):
+        return self
+
+    def to(self, device):
+        return self
+
+
 class Predicter(nn.Module):
     def __init__(
         self,
         num_classes=2,
         img_size=180,
         model_weights_path=None,
+        num_threads=None,
+        backend="eager",
+        exported_model_path=None,
     ):
+        """
+        Args:
+            backend: "eager" (PyTorch model loaded from model_weights_path),
+                "torchscript" (frozen TorchScript module), "onnx" (ONNX
+                Runtime, CPU) or "int8" (TorchScript of the model quantized by
+                quantize()), the last three loading exported_model_path as
+                written by export().
+        """
         super(Predicter, self).__init__()
+        self.backend = backend
+        if backend not in ("eager", "torchscript", "onnx", "int8"):
+            raise ValueError(
+                "Invalid backend. Expected 'eager', 'torchscript', 'onnx' or 'int8'."
+            )
+        if backend != "eager" and exported_model_path is None:
+            raise ValueError(f"{backend} backend needs exported_model_path.")
+
         if num_classes == 3:
             # self.img_size= 150,
             self.img_size = 150
 
-            self.model = InceptionResNetV2(num_classes)
+            if backend == "eager":
+                self.model = InceptionResNetV2(num_classes)
             if model_weights_path is None:
                 model_weights_path = "/home/bota/Desktop/active_sensing/src/model/model_resnet_single_image.p"
 
         elif num_classes == 2:
             self.img_size = img_size
-            self.model = ModifiedClassifier(num_classes=num_classes)
+            if backend == "eager":
+                # the checkpoint overwrites the ImageNet weights: don't load them
+                self.model = ModifiedClassifier(
+                    num_classes=num_classes, pretrained=model_weights_path is None
+                )
 
         else:
             raise ValueError("Invalid number of classes. Expected 2 or 3.")
 
-        if model_weights_path is not None:
+        if backend in ("torchscript", "int8"):
+            if backend == "int8":
+                torch.backends.quantized.engine = quantized_engine()
+            self.model = torch.jit.load(exported_model_path, map_location="cpu")
+        elif backend == "onnx":
+            self.model = OnnxModel(exported_model_path, num_threads=num_threads)
+        elif model_weights_path is not None:
             self.model.load_state_dict(
                 torch.load(
                     model_weights_path,
@@ -54,6 +130,8 @@ class Predicter(nn.Module):
         # self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.device = torch.device("cpu")
         self.model = self.model.to(self.device)
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
 
         # super(ModifiedClassifier, self).__init__()
         self.transform = transforms.Compose(
@@ -66,6 +144,14 @@ class Predicter(nn.Module):
             ]
         )
 
+        # Normalize of self.transform as (1, 3, 1, 1) tensors, for batches
+        self.mean = torch.tensor([0.485, 0.456, 0.406]).view(1, 3, 1, 1)
+        self.std = torch.tensor([0.229, 0.224, 0.225]).view(1, 3, 1, 1)
+        # reusable input buffers of predict_array_labels, by shape
+        self.buffers = {}
+        # tiles/sec of the last predict_array_labels call
+        self.throughput = None
+
         self.num_classes = num_classes
 
     def predict(self, img_path):
@@ -98,6 +184,203 @@ class Predicter(nn.Module):
 
                 return preds
 
+    def predict_labels(self, images, batch_size=64, executor=None):
+        """
+        Class labels of a sequence of PIL images, as predict() gives them one
+        at a time, computed batch_size images per forward pass.
+
+        Args:
+            images: PIL images (or image paths).
+            batch_size: number of images per forward pass.
+            executor: optional concurrent.futures executor to run the
+                preprocessing transforms in parallel.
+
+        Returns:
+            np.ndarray: (len(images),) int labels.
+        """
+        self.model.eval()
+        labels = np.empty(len(images), dtype=int)
+
+        with torch.inference_mode():
+            for i in range(0, len(images), batch_size):
+                batch = [
+                    Image.open(img) if isinstance(img, str) else img
+                    for img in images[i : i + batch_size]
+                ]
+                if executor is not None:
+                    data = list(executor.map(self.transform, batch))
+                else:
+                    data = [self.transform(img) for img in batch]
+                outputs = self.model(torch.stack(data).to(self.device))
+                labels[i : i + len(batch)] = self._labels(outputs)
+
+        return labels
+
+    def predict_input_labels(self, inputs, batch_size=64):
+        """
+        Class labels of images already resized to the model input, skipping
+        the PIL transforms: only the normalization is applied, as tensor ops.
+
+        Args:
+            inputs: (N, 3, img_size, img_size) float32 RGB images, values in
+                [0, 255] (e.g. img_sampler.batch_at_alt).
+            batch_size: number of images per forward pass.
+
+        Returns:
+            np.ndarray: (N,) int labels.
+        """
+        self.model.eval()
+        labels = np.empty(len(inputs), dtype=int)
+
+        with torch.inference_mode():
+            for i in range(0, len(inputs), batch_size):
+                data = torch.as_tensor(inputs[i : i + batch_size], dtype=torch.float32)
+                data = (data / 255 - self.mean) / self.std
+                outputs = self.model(data.to(self.device))
+                labels[i : i + len(data)] = self._labels(outputs)
+
+        return labels
+
+    def _buffer(self, shape):
+        if shape not in self.buffers:
+            if self.device.type == "cuda":
+                # page-locked for the non_blocking host to GPU copy
+                buffer = torch.empty(shape, dtype=torch.float32, pin_memory=True)
+            else:
+                buffer = torch.empty(shape, dtype=torch.float32)
+            self.buffers[shape] = buffer
+        return self.buffers[shape]
+
+    def predict_array_labels(self, images, batch_size=64, num_threads=None):
+        """
+        Class labels of a uint8 NHWC batch (e.g. chips of a ChipStore), the
+        resize and normalization of self.transform being done as tensor ops
+        on reusable (pinned if on GPU) buffers. The throughput of the call is
+        kept in self.throughput (tiles/sec).
+
+        Args:
+            images: (N, H, W, 3) uint8 RGB images.
+            batch_size: number of images per forward pass.
+            num_threads: torch.set_num_threads for the call, None to keep it.
+
+        Returns:
+            np.ndarray: (N,) int labels.
+        """
+        start = time.perf_counter()
+        threads = torch.get_num_threads()
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        self.model.eval()
+        labels = np.empty(len(images), dtype=int)
+        height, width = images.shape[1:3]
+
+        try:
+            with torch.inference_mode():
+                for i in range(0, len(images), batch_size):
+                    batch = images[i : i + batch_size]
+                    data = self._buffer((len(batch), 3, height, width))
+                    # NHWC uint8 to NCHW float32 straight into the buffer: the
+                    # images may be read-only (memory-mapped chips)
+                    np.copyto(data.numpy(), batch.transpose(0, 3, 1, 2))
+                    if (height, width) != (self.img_size, self.img_size):
+                        # bilinear antialiased, as transforms.Resize
+                        data = torch.nn.functional.interpolate(
+                            data,
+                            size=(self.img_size, self.img_size),
+                            mode="bilinear",
+                            align_corners=False,
+                            antialias=True,
+                        )
+                    data = data.div_(255).sub_(self.mean).div_(self.std)
+                    outputs = self.model(data.to(self.device, non_blocking=True))
+                    labels[i : i + len(batch)] = self._labels(outputs)
+        finally:
+            torch.set_num_threads(threads)
+
+        self.throughput = len(images) / (time.perf_counter() - start)
+        return labels
+
+    def quantize(self, calibration_batches):
+        """
+        Post-training static int8 quantization (FX graph mode) of the eager
+        model, observers being calibrated on calibration_batches, then
+        switch to the "int8" backend. CPU only.
+
+        Args:
+            calibration_batches: iterable of normalized (N, 3, img_size,
+                img_size) float tensors, e.g. orthomap tiles through
+                self.transform.
+        """
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+        if self.backend != "eager":
+            raise ValueError("Only the eager model can be quantized.")
+        engine = quantized_engine()
+        torch.backends.quantized.engine = engine
+
+        model = copy.deepcopy(self.model).to("cpu").eval()
+        example = torch.zeros(1, 3, self.img_size, self.img_size)
+        prepared = prepare_fx(
+            model, get_default_qconfig_mapping(engine), example_inputs=(example,)
+        )
+        with torch.inference_mode():
+            for batch in calibration_batches:
+                prepared(batch)
+        self.model = convert_fx(prepared)
+        self.device = torch.device("cpu")
+        self.backend = "int8"
+        return self
+
+    def export(self, out_dir, name="classifier"):
+        """
+        Export the eager model to out_dir as a traced, frozen and
+        inference-optimized TorchScript module (name.pt) and an ONNX model
+        with a dynamic batch size (name.onnx), both loadable with the
+        backend argument. A quantized model is only exported to TorchScript
+        (name_int8.pt).
+
+        Returns:
+            tuple: paths of the TorchScript and ONNX (None if quantized) files.
+        """
+        if self.backend not in ("eager", "int8"):
+            raise ValueError("Only the eager or quantized model can be exported.")
+        os.makedirs(out_dir, exist_ok=True)
+        if self.backend == "int8":
+            name = f"{name}_int8"
+        script_path = os.path.join(out_dir, f"{name}.pt")
+        onnx_path = os.path.join(out_dir, f"{name}.onnx")
+
+        self.model.eval()
+        example = torch.zeros(1, 3, self.img_size, self.img_size, device=self.device)
+        with torch.no_grad():
+            traced = torch.jit.trace(self.model, example)
+            frozen = torch.jit.freeze(traced)
+            if self.backend == "eager":
+                frozen = torch.jit.optimize_for_inference(frozen)
+        frozen.save(script_path)
+        if self.backend == "int8":
+            return script_path, None
+
+        torch.onnx.export(
+            self.model,
+            example,
+            onnx_path,
+            input_names=["input"],
+            output_names=["output"],
+            dynamic_axes={"input": {0: "batch"}, "output": {0: "batch"}},
+            opset_version=17,
+        )
+        return script_path, onnx_path
+
+    def _labels(self, outputs):
+        if self.num_classes == 3:
+            preds = torch.argmax(outputs, dim=1)
+        else:
+            # first class whose probability is over 0.5, as predict()
+            preds = torch.argmax((torch.sigmoid(outputs) > 0.5).int(), dim=1)
+        return preds.cpu().numpy()
+
     # Update predict function to handle batch prediction with a fixed batch size
     def predict_batch(self, img_paths, batch_size=64):
         self.model.eval()
@@ -7,9 +7,15 @@ from torchvision.models import mobilenet_v3_small, MobileNet_V3_Small_Weights
 
 
 class ModifiedClassifier(nn.Module):
-    def __init__(self, num_classes=2):
+    def __init__(self, num_classes=2, pretrained=True):
+        """
+        Args:
+            pretrained: start from the ImageNet weights (downloaded if not
+                cached), False to only build the architecture, e.g. before
+                loading a fine-tuned checkpoint.
+        """
         super(ModifiedClassifier, self).__init__()
-        weights = MobileNet_V3_Small_Weights.DEFAULT
+        weights = MobileNet_V3_Small_Weights.DEFAULT if pretrained else None
         self.backbone = mobilenet_v3_small(weights=weights)
         # self.backbone = models.efficientnet_b0(
         #     pretrained=True
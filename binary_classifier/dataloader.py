@@ -1,6 +1,5 @@
 # dataset
 from PIL import Image
-from osgeo import gdal
 import numpy as np
 
 
@@ -10,19 +9,28 @@ from torch.utils.data import Dataset
 import random
 from torchvision import transforms
 
+from binary_classifier.chip_store import ChipStore
+from binary_classifier.orthomap_reader import OrthomapReader
+
 
 class WheatOthomapDataset(Dataset):
-    def __init__(self, ortomap_path, annotation_path, tile_ortomappixel_path):
-        dataset = gdal.Open(ortomap_path)
-        band1 = dataset.GetRasterBand(1)  # Red channel
-        band2 = dataset.GetRasterBand(2)  # Green channel
-        band3 = dataset.GetRasterBand(3)  # Blue channel
-
-        b1 = band1.ReadAsArray()
-        b2 = band2.ReadAsArray()
-        b3 = band3.ReadAsArray()
-        self.img = np.dstack((b1, b2, b3))
+    def __init__(
+        self,
+        ortomap_path,
+        annotation_path,
+        tile_ortomappixel_path,
+        block_size=1024,
+        cache_blocks=64,
+        chip_store_dir=None,
+    ):
+        self.img = OrthomapReader(
+            ortomap_path, block_size=block_size, cache_blocks=cache_blocks
+        )
         self.tile_pixel_loc = self._parse_tile_file(tile_ortomappixel_path)
+        # tiles pre-cut into a memory-mapped store, see ChipStore
+        self.chips = None
+        if chip_store_dir is not None:
+            self.chips = ChipStore.build(chip_store_dir, self.img, self.tile_pixel_loc)
         self.labels = self._read_annotations_to_matrix(annotation_path)
         self.tiles = [(row, col) for row in range(3, 113) for col in range(13, 73)]
 
@@ -103,6 +111,8 @@ class WheatOthomapDataset(Dataset):
         return x_range, y_range
 
     def _get_tile_img(self, tile):
+        if self.chips is not None:
+            return Image.fromarray(self.chips.chip(tile))
         x_range, y_range = self._get_image_range(tile)
         cropped_img = self.img[x_range, y_range, :]
         return Image.fromarray(cropped_img)
@@ -0,0 +1,123 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from osgeo import gdal
+
+gdal.UseExceptions()
+
+
+class OrthomapReader:
+    """
+    Windowed reader of the RGB bands of an orthomosaic, a drop-in for the
+    (rows, cols, 3) array of the whole image: reader[rows, cols, :] reads
+    only the pixels asked for. Pixels are read from GDAL in square blocks
+    with windowed ReadAsArray calls and the last cache_blocks blocks are kept
+    in an LRU cache, so neighbouring tiles share reads.
+
+    Args:
+        path: orthomosaic file.
+        block_size: side of the blocks read from the file, in pixels.
+        cache_blocks: number of blocks kept in memory.
+    """
+
+    def __init__(self, path, block_size=1024, cache_blocks=64):
+        self.path = path
+        self.block_size = block_size
+        self.cache_blocks = cache_blocks
+        self._init_state()
+        dataset = self._dataset()
+        self.shape = (dataset.RasterYSize, dataset.RasterXSize, 3)
+
+    def _init_state(self):
+        self.blocks = OrderedDict()
+        # GDAL datasets are not thread safe: one handle per thread, the lock
+        # only guarding the LRU cache, so that threads read blocks in parallel
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        # the lock and GDAL handles can't be pickled (e.g. DataLoader workers
+        # started with spawn): reopened by the unpickled reader
+        state = self.__dict__.copy()
+        for name in ("blocks", "local", "lock"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_state()
+
+    def _dataset(self):
+        local = self.local
+        if getattr(local, "pid", None) != os.getpid():
+            # new thread, or forked (e.g. DataLoader workers): own file handle
+            local.dataset = gdal.Open(self.path)
+            local.pid = os.getpid()
+        return local.dataset
+
+    def _read_block(self, block_i, block_j):
+        dataset = self._dataset()
+        y_off = block_i * self.block_size
+        x_off = block_j * self.block_size
+        y_size = min(self.block_size, self.shape[0] - y_off)
+        x_size = min(self.block_size, self.shape[1] - x_off)
+        bands = [
+            dataset.GetRasterBand(band).ReadAsArray(x_off, y_off, x_size, y_size)
+            for band in (1, 2, 3)  # Red, Green, Blue channels
+        ]
+        return np.dstack(bands)
+
+    def _block(self, block_i, block_j):
+        key = (block_i, block_j)
+        with self.lock:
+            if key in self.blocks:
+                self.blocks.move_to_end(key)
+                return self.blocks[key]
+        # read outside of the lock, a block missed by two threads at once
+        # being read by both
+        block = self._read_block(block_i, block_j)
+        with self.lock:
+            self.blocks[key] = block
+            self.blocks.move_to_end(key)
+            if len(self.blocks) > self.cache_blocks:
+                self.blocks.popitem(last=False)
+        return block
+
+    def read(self, rows, cols):
+        """
+        (n_rows, n_cols, 3) pixels of the window [rows, cols] (slices).
+        """
+        row_min, row_max, _ = rows.indices(self.shape[0])
+        col_min, col_max, _ = cols.indices(self.shape[1])
+        row_max, col_max = max(row_min, row_max), max(col_min, col_max)
+        size = self.block_size
+
+        window = None
+        for block_i in range(row_min // size, -(-row_max // size)):
+            for block_j in range(col_min // size, -(-col_max // size)):
+                block = self._block(block_i, block_j)
+                if window is None:
+                    window = np.empty(
+                        (row_max - row_min, col_max - col_min, 3), dtype=block.dtype
+                    )
+                # overlap of the block and the window, in image coordinates
+                r0 = max(row_min, block_i * size)
+                r1 = min(row_max, block_i * size + block.shape[0])
+                c0 = max(col_min, block_j * size)
+                c1 = min(col_max, block_j * size + block.shape[1])
+                window[r0 - row_min : r1 - row_min, c0 - col_min : c1 - col_min] = (
+                    block[
+                        r0 - block_i * size : r1 - block_i * size,
+                        c0 - block_j * size : c1 - block_j * size,
+                    ]
+                )
+        if window is None:
+            window = np.empty((0, 0, 3), dtype=np.uint8)
+        return window
+
+    def __getitem__(self, index):
+        rows, cols = index[0], index[1]
+        window = self.read(rows, cols)
+        return window if len(index) < 3 else window[:, :, index[2]]
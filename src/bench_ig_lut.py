@@ -0,0 +1,69 @@
+"""
+Accuracy and speed of the quantized IG lookup tables (IGLookupTable) against
+the exact H - cH evaluation of planning, at the camera altitudes.
+
+    python bench_ig_lut.py [bits ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from helper import IGLookupTable
+from planner import planning
+
+
+def best_time(fn, repeats=20):
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(
+    bits_list, shape=(110, 60), altitudes=(19.5, 24.0, 30.0, 35.0, 40.0, 45.0)
+):
+    class grid_info:
+        pass
+
+    grid_info.shape = shape
+    planner = planning(grid_info, None, "ig")
+    rng = np.random.default_rng(0)
+    belief = rng.beta(0.5, 0.5, size=shape)
+    sigmas_list = [planner._sigmas(h) for h in altitudes]
+
+    def exact():
+        return [planner.H(belief) - planner.cH(belief, *s) for s in sigmas_list]
+
+    reference = exact()
+    t_exact = best_time(exact)
+    print(f"exact: {t_exact * 1e3:.3f} ms for {len(altitudes)} altitudes")
+
+    for bits in bits_list:
+        lut = IGLookupTable(planner.H, planner.cH, bits=bits)
+        start = time.perf_counter()
+        lut.precompute(sigmas_list)
+        t_build = time.perf_counter() - start
+
+        def lookup():
+            return [lut(belief, s) for s in sigmas_list]
+
+        t_lut = best_time(lookup)
+        cell_error = max(np.max(np.abs(a - b)) for a, b in zip(lookup(), reference))
+        sum_error = max(
+            abs(np.sum(a) - np.sum(b)) / np.sum(b) for a, b in zip(lookup(), reference)
+        )
+        # midpoint estimate of IGLookupTable.max_error, not a guaranteed bound
+        estimated = max(lut.max_error(s) for s in sigmas_list)
+        print(
+            f"{bits:2d} bits: {t_lut * 1e3:.3f} ms ({t_exact / t_lut:.1f}x), "
+            f"build {t_build * 1e3:.1f} ms, max cell error {cell_error:.2e} "
+            f"(estimated max error {estimated:.2e}), map IG rel. error {sum_error:.2e}"
+        )
+
+
+if __name__ == "__main__":
+    benchmark([int(b) for b in sys.argv[1:]] or [8, 12, 16])
@@ -0,0 +1,59 @@
+"""
+Tile classifier throughput (tiles/sec) of Predicter.predict_labels (PIL
+transforms per tile) against predict_array_labels (uint8 NHWC batches), for
+several batch sizes and torch thread counts. Tiles are read from a ChipStore
+if one is given, else random.
+
+    python bench_predicter.py [chip_store_dir]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from binary_classifier.chip_store import ChipStore
+from binary_classifier.classifier import Predicter, model_path
+
+
+def load_tiles(store_dir=None, n_tiles=512, size=189):
+    if store_dir is None:
+        rng = np.random.default_rng(0)
+        return rng.integers(0, 256, (n_tiles, size, size, 3), dtype=np.uint8)
+    store = ChipStore(store_dir)
+    # full-size chips only, so they stack without padding
+    full = np.flatnonzero((store.shapes == store.chips.shape[1:3]).all(axis=1))
+    return np.asarray(store.chips[full[:n_tiles]])
+
+
+def benchmark(tiles, batch_sizes=(16, 64, 256), threads=(1, 4, None)):
+    predicter = Predicter(model_weights_path=model_path, num_classes=2)
+    images = [Image.fromarray(tile) for tile in tiles]
+    print(f"{len(tiles)} tiles of {tiles.shape[1]}x{tiles.shape[2]}")
+
+    default_threads = torch.get_num_threads()
+    for num_threads in threads:
+        for batch_size in batch_sizes:
+            torch.set_num_threads(num_threads or default_threads)
+            start = time.perf_counter()
+            reference = predicter.predict_labels(images, batch_size=batch_size)
+            pil_rate = len(tiles) / (time.perf_counter() - start)
+            torch.set_num_threads(default_threads)
+
+            labels = predicter.predict_array_labels(
+                tiles, batch_size=batch_size, num_threads=num_threads
+            )
+            print(
+                f"threads {num_threads or 'default'}, batch {batch_size:3d}: "
+                f"PIL {pil_rate:.1f} tiles/s, array {predicter.throughput:.1f} "
+                f"tiles/s ({predicter.throughput / pil_rate:.1f}x), "
+                f"{np.mean(labels == reference):.1%} same labels"
+            )
+
+
+if __name__ == "__main__":
+    benchmark(load_tiles(sys.argv[1] if len(sys.argv) > 1 else None))
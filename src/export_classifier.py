@@ -0,0 +1,23 @@
+"""
+Export the tile classifier to TorchScript (frozen, inference-optimized) and
+ONNX, for Predicter(backend="torchscript" / "onnx", exported_model_path=...).
+
+    python export_classifier.py [model_weights_path] [out_dir]
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from binary_classifier.classifier import Predicter, model_path
+
+
+def export(weights_path=model_path, out_dir="models"):
+    predicter = Predicter(model_weights_path=weights_path, num_classes=2)
+    name = os.path.splitext(os.path.basename(weights_path))[0]
+    for path in predicter.export(out_dir, name=name):
+        print(f"exported {path}")
+
+
+if __name__ == "__main__":
+    export(*sys.argv[1:3])
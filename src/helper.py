@@ -1,7 +1,36 @@
 # pairwise_factor_weights: equal, biased, adaptive
+import os
 import numpy as np
+from scipy.special import ndtr
 from sklearn.metrics import confusion_matrix
 
+# Validation of hot-path invariants (probability ranges, NaNs, ...):
+#   "off"   no checks
+#   "cheap" checks on final outputs only
+#   "full"  every intermediate check as well
+# Set once at startup with set_validation_level() or through the
+# ACTIVE_SENSING_VALIDATION environment variable.
+VALIDATION_LEVELS = {"off": 0, "cheap": 1, "full": 2}
+_validation_level = VALIDATION_LEVELS[
+    os.environ.get("ACTIVE_SENSING_VALIDATION", "full")
+]
+
+
+def set_validation_level(level):
+    global _validation_level
+    if level not in VALIDATION_LEVELS:
+        raise ValueError(
+            f"Validation level must be one of {list(VALIDATION_LEVELS)}, got {level}"
+        )
+    _validation_level = VALIDATION_LEVELS[level]
+
+
+def validate(level):
+    """
+    True if checks of the given level ("cheap" or "full") are enabled.
+    """
+    return _validation_level >= VALIDATION_LEVELS[level]
+
 
 def collect_sample_set(grid):
     # Create an array of central cells for each 3x3 block (using slices)
@@ -94,6 +123,252 @@ class uav_position:
         return hash((self.position, self.altitude))
 
 
+def summed_area_table(values):
+    """
+    Integral image of a 2D array, padded with a leading row and column of
+    zeros so that table[i, j] is the sum of values[:i, :j].
+    """
+    table = np.zeros((values.shape[0] + 1, values.shape[1] + 1))
+    np.cumsum(values, axis=0, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+    return table
+
+
+def rectangle_sum(table, i_min, i_max, j_min, j_max):
+    """
+    Sum of values[i_min:i_max, j_min:j_max] read from its summed-area table.
+    """
+    return (
+        table[i_max, j_max]
+        - table[i_min, j_max]
+        - table[i_max, j_min]
+        + table[i_min, j_min]
+    )
+
+
+class IGLookupTable:
+    """
+    Quantized lookup tables of the per-cell expected information gain
+    H(p) - H(m|z)(p, s0, s1), one per sensor model (s0, s1). The belief is
+    quantized to 2**bits levels on [0, 1], so the IG of a belief patch is one
+    gather instead of four log2 evaluations per cell.
+
+    Args:
+        H, cH: entropy and conditional entropy functions, H(var) and
+            cH(var, sigma0, sigma1).
+        bits: quantization of the belief (accuracy knob); max_error() estimates
+            the worst case error per cell for a sensor model.
+    """
+
+    def __init__(self, H, cH, bits=16):
+        if not 1 <= bits <= 24:
+            raise ValueError(f"bits must be in [1, 24], got {bits}")
+        self.H = H
+        self.cH = cH
+        self.bits = bits
+        self.n_levels = 2**bits
+        self.index_dtype = np.uint16 if bits <= 16 else np.uint32
+        self.levels = np.linspace(0.0, 1.0, self.n_levels)
+        # sigmas -> IG at each quantization level
+        self.tables = {}
+
+    def precompute(self, sigmas_list):
+        """
+        Build the tables of the given (s0, s1) pairs, e.g. conf_dict.values().
+        """
+        for sigmas in sigmas_list:
+            self.table(sigmas)
+
+    def table(self, sigmas):
+        sigmas = (float(sigmas[0]), float(sigmas[1]))
+        if sigmas not in self.tables:
+            self.tables[sigmas] = self.H(self.levels) - self.cH(self.levels, *sigmas)
+        return self.tables[sigmas]
+
+    def quantize(self, var):
+        return np.rint(np.clip(var, 0.0, 1.0) * (self.n_levels - 1)).astype(
+            self.index_dtype
+        )
+
+    def __call__(self, var, sigmas):
+        """
+        Per-cell IG of the belief (patch) var under the sensor model sigmas.
+        """
+        return self.table(sigmas)[self.quantize(var)]
+
+    def max_error(self, sigmas):
+        """
+        Estimate of the largest error of the table w.r.t. the exact IG,
+        evaluated at the midpoints between levels.
+        """
+        midpoints = (self.levels[:-1] + self.levels[1:]) / 2
+        exact = self.H(midpoints) - self.cH(midpoints, *sigmas)
+        return np.max(np.abs(self(midpoints, sigmas) - exact))
+
+
+class IGIntegralMap:
+    """
+    Summed-area tables of the per-cell expected information gain
+    H(m) - H(m|z) of a belief map, one per sensor model (s0, s1), so that the
+    total IG of any footprint [i_min:i_max, j_min:j_max] is read in O(1).
+
+    Tables are built lazily on the first query for a sensor model. After
+    update(), only the cells that changed are re-evaluated; the table is then
+    re-accumulated from the first changed row down, which is a cumsum and no
+    entropy evaluation.
+
+    Args:
+        belief: P(m=1) map of shape (n_rows, n_cols).
+        H, cH: entropy and conditional entropy functions, H(var) and
+            cH(var, sigma0, sigma1).
+        conf_dict: {altitude: (s0, s1)}; if None sigmas follow a(1-exp(-bh)),
+            a and b being scalars or (for s0, for s1) pairs.
+        lut: optional IGLookupTable used in place of H - cH.
+    """
+
+    def __init__(self, belief, H, cH, conf_dict=None, a=1, b=0.015, lut=None):
+        self.belief = np.array(belief, dtype=float)
+        self.H = H
+        self.cH = cH
+        self.lut = lut
+        self.conf_dict = conf_dict
+        self.a = np.asarray(a, dtype=float)
+        self.b = np.asarray(b, dtype=float)
+        # sigmas -> {"ig", "row_sums", "table", "dirty"}
+        self.tables = {}
+        # incremented on every belief change, to key caches of query results
+        self.version = 0
+
+    def sigmas(self, altitude):
+        if self.conf_dict is not None:
+            s0, s1 = self.conf_dict[np.round(altitude, decimals=2)]
+        else:
+            s0, s1 = np.broadcast_to(self.a * (1 - np.exp(-self.b * altitude)), 2)
+        return float(s0), float(s1)
+
+    def update(self, belief, fp_vertices_ij=None):
+        """
+        Take in a new belief map. The changed cells are the footprint
+        fp_vertices_ij of the last belief update if given (grow it by one cell
+        when LBP ran), else found by comparison with the previous belief.
+        """
+        if fp_vertices_ij is not None:
+            i_min, i_max = fp_vertices_ij["ul"][0], fp_vertices_ij["bl"][0]
+            j_min, j_max = fp_vertices_ij["ul"][1], fp_vertices_ij["ur"][1]
+        else:
+            changed = belief != self.belief
+            rows = np.flatnonzero(np.any(changed, axis=1))
+            if rows.size == 0:
+                return
+            cols = np.flatnonzero(np.any(changed, axis=0))
+            i_min, i_max = rows[0], rows[-1] + 1
+            j_min, j_max = cols[0], cols[-1] + 1
+
+        self.belief[i_min:i_max, j_min:j_max] = belief[i_min:i_max, j_min:j_max]
+        self.version += 1
+        for table in self.tables.values():
+            if table["dirty"] is None:
+                table["dirty"] = [i_min, i_max, j_min, j_max]
+            else:
+                dirty = table["dirty"]
+                dirty[0], dirty[1] = min(dirty[0], i_min), max(dirty[1], i_max)
+                dirty[2], dirty[3] = min(dirty[2], j_min), max(dirty[3], j_max)
+
+    def cell_ig(self, var, sigmas):
+        """
+        Per-cell expected IG of the belief patch var with sensor model sigmas.
+        """
+        if self.lut is not None:
+            return self.lut(var, sigmas)
+        return self.H(var) - self.cH(var, *sigmas)
+
+    def _table(self, sigmas):
+        if sigmas not in self.tables:
+            n_rows, n_cols = self.belief.shape
+            self.tables[sigmas] = {
+                "ig": np.zeros((n_rows, n_cols)),
+                "row_sums": np.zeros((n_rows, n_cols + 1)),
+                "table": np.zeros((n_rows + 1, n_cols + 1)),
+                "dirty": [0, n_rows, 0, n_cols],
+            }
+        table = self.tables[sigmas]
+        if table["dirty"] is not None:
+            i_min, i_max, j_min, j_max = table["dirty"]
+            var = self.belief[i_min:i_max, j_min:j_max]
+            table["ig"][i_min:i_max, j_min:j_max] = self.cell_ig(var, sigmas)
+            np.cumsum(
+                table["ig"][i_min:i_max], axis=1, out=table["row_sums"][i_min:i_max, 1:]
+            )
+            np.cumsum(
+                table["row_sums"][i_min:], axis=0, out=table["table"][i_min + 1 :]
+            )
+            table["table"][i_min + 1 :] += table["table"][i_min]
+            table["dirty"] = None
+        return table["table"]
+
+    def query(self, altitude, i_min, i_max, j_min, j_max, sigmas=None):
+        """
+        Total expected IG over [i_min:i_max, j_min:j_max] when observing from
+        the given altitude (or with the given (s0, s1)).
+        """
+        if sigmas is None:
+            sigmas = self.sigmas(altitude)
+        return rectangle_sum(self._table(tuple(sigmas)), i_min, i_max, j_min, j_max)
+
+
+class BitMap:
+    """
+    Binary 2D map stored bit-packed along the rows (8 cells per byte).
+    Slicing a rectangle [i_min:i_max, j_min:j_max] unpacks only the bytes
+    covering it and returns a uint8 array; indexing a cell returns its value
+    and a single row index [i] the whole row.
+
+    Args:
+        packed: (n_rows, ceil(n_cols / 8)) uint8 array of np.packbits rows.
+        shape: (n_rows, n_cols) of the map.
+    """
+
+    def __init__(self, packed, shape):
+        self.packed = packed
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_array(cls, values):
+        values = np.asarray(values)
+        return cls(np.packbits(values != 0, axis=1), values.shape)
+
+    @property
+    def nbytes(self):
+        return self.packed.nbytes
+
+    def to_array(self):
+        return np.unpackbits(self.packed, axis=1, count=self.shape[1])
+
+    def __array__(self, dtype=None, copy=None):
+        values = self.to_array()
+        return values if dtype is None else values.astype(dtype)
+
+    def __getitem__(self, index):
+        rows, cols = index if isinstance(index, tuple) else (index, slice(None))
+        n_cols = self.shape[1]
+        if isinstance(cols, slice):
+            j_min, j_max, step = cols.indices(n_cols)
+            if step != 1:
+                return self.to_array()[rows, cols]
+            j_max = max(j_min, j_max)
+            byte_min = j_min // 8
+            byte_max = -(-j_max // 8)
+            values = np.unpackbits(self.packed[rows, byte_min:byte_max], axis=-1)
+            offset = j_min - 8 * byte_min
+            return values[..., offset : offset + j_max - j_min]
+        # bounds and negative columns w.r.t. n_cols, not the padded byte rows
+        cols = np.asarray(cols)
+        if np.any((cols < -n_cols) | (cols >= n_cols)):
+            raise IndexError(f"column index {cols} out of range for {n_cols} columns")
+        cols = cols % n_cols
+        return (self.packed[rows, cols // 8] >> (7 - cols % 8)) & 1
+
+
 def compute_mse(ground_truth_map, estimated_map):
     if ground_truth_map.shape != estimated_map.shape:
         raise ValueError("Input maps must have the same dimensions for MSE")
@@ -110,8 +385,9 @@ def compute_coverage(ms_set, grid):
 
 
 def compute_entropy(belief):
-    assert np.all(np.greater_equal(belief, 0.0)), f"{belief[np.isnan(belief)]}"
-    assert np.all(np.less_equal(belief, 1.0)), f"{belief[np.isnan(belief)]}"
+    if validate("cheap"):
+        assert np.all(np.greater_equal(belief, 0.0)), f"{belief[np.isnan(belief)]}"
+        assert np.all(np.less_equal(belief, 1.0)), f"{belief[np.isnan(belief)]}"
 
     if belief.ndim == 3:
         v1 = belief[:, :, 0]
@@ -130,12 +406,14 @@ def compute_entropy(belief):
 
     l1 = np.log2(v1)
     l2 = np.log2(v2)
-    assert np.all(np.less_equal(l1, 0.0))
-    assert np.all(np.less_equal(l2, 0.0))
+    if validate("full"):
+        assert np.all(np.less_equal(l1, 0.0))
+        assert np.all(np.less_equal(l2, 0.0))
 
     entropy = np.sum(-(v1 * l1 + v2 * l2))
 
-    assert np.all(np.greater_equal(entropy, 0.0))
+    if validate("cheap"):
+        assert np.all(np.greater_equal(entropy, 0.0))
 
     return entropy.astype(float)
 
@@ -262,94 +540,282 @@ class FastLogger:
         return info, (entropy, mse, height, coverage)
 
 
-import os
-import pickle
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
 
 
-def gaussian_random_field(cluster_radius, n_cell):
+@contextmanager
+def atomic_write(path):
+    """
+    Temporary file next to path to write in the with block, moved to path
+    once the block completes (removed if it raises), so that a reader never
+    sees a partial file at path.
+
+    Yields:
+    - path of the temporary file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+@lru_cache(maxsize=16)
+def grf_amplitude(cluster_radius, shape):
+    """
+    Spectral amplitude |k|^(-cluster_radius / 2) of a 2D Gaussian random field
+    on the rfft2 frequency grid of a field of the given shape (0 at k = 0).
+    Cached per (cluster_radius, shape) and read-only.
+    """
+    kx = np.fft.fftfreq(shape[0], d=1.0 / shape[0])
+    ky = np.fft.rfftfreq(shape[1], d=1.0 / shape[1])
+    k2 = kx[:, None] ** 2 + ky[None, :] ** 2
+    amplitude = np.zeros_like(k2)
+    np.power(k2, -cluster_radius / 4, out=amplitude, where=k2 > 0)
+    amplitude.setflags(write=False)
+    return amplitude
+
+
+# binarization threshold of the normalized Gaussian fields
+GRF_THRESHOLD = 0.5
+
+
+class FieldCache:
+    """
+    Content-addressed on-disk cache of binary fields: a field is stored
+    bit-packed under the hash of the parameters that generated it. Writes go
+    through a temporary file renamed in place, so a reader never sees a
+    partial entry. When the cache grows over max_bytes, the least recently
+    used entries are deleted.
+
+    Args:
+        cache_dir: directory of the entries.
+        max_bytes: size bound of the cache directory.
+    """
+
+    def __init__(self, cache_dir="cache/fields", max_bytes=256 * 2**20):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(**params):
+        """
+        Hash of the field parameters (order independent).
+        """
+        description = repr(sorted(params.items()))
+        return hashlib.sha256(description.encode()).hexdigest()[:32]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npy")
+
+    def load(self, key, shape):
+        """
+        The cached field of the given shape, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            packed = np.load(path)
+        except (OSError, ValueError):
+            return None
+        # mark as recently used
+        os.utime(path)
+        count = int(np.prod(shape))
+        return np.unpackbits(packed, count=count).reshape(shape)
+
+    def store(self, key, field):
+        with atomic_write(self._path(key)) as tmp_path:
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.packbits(field.astype(np.uint8, copy=False)))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def gaussian_random_field(cluster_radius, n_cell, seed=123, cache=None):
     """
     Generate a 2D Gaussian random field and cache the results for reuse.
      https://andrewwalker.github.io/statefultransitions/post/gaussian-fields/
     Parameters:
     - cluster_radius: Correlation radius for the Gaussian field.
     - n_cell: Size of the field (n_cell_x x n_cell_y).
-
-    - cache_dir: Directory to store cached fields (default: "cache").
+    - seed: Seed of the white noise of the field.
+    - cache: FieldCache to read the field from / store it to (None: no cache).
 
     Returns:
     - 2D binary random field as a numpy array.
     """
+    if cache is None:
+        return gaussian_random_fields(cluster_radius, n_cell, [seed])[0]
+
+    n_cell = tuple(int(n) for n in n_cell)
+    key = FieldCache.key(
+        generator="gaussian_random_field",
+        cluster_radius=float(cluster_radius),
+        shape=n_cell,
+        seed=int(seed),
+        threshold=GRF_THRESHOLD,
+    )
+    binary_field = cache.load(key, n_cell)
+    if binary_field is None:
+        binary_field = gaussian_random_fields(cluster_radius, n_cell, [seed])[0]
+        cache.store(key, binary_field)
+    return binary_field
+
+
+def gaussian_random_fields(cluster_radius, n_cell, seeds):
+    """
+    Generate one binary Gaussian random field per seed with a single stacked
+    FFT; field k is gaussian_random_field(cluster_radius, n_cell, seeds[k]).
+
+    Returns:
+    - (len(seeds), n_cell_x, n_cell_y) uint8 array.
+    """
+    n_cell = tuple(n_cell)
+    noise = np.stack(
+        [np.random.default_rng(seed).normal(size=n_cell) for seed in seeds]
+    )
 
-    # Ensure cache directory exists
-    n_cell_x, n_cell_y = n_cell
-
-    # Helper functions
-    def _fft_indices(n):
-        a = list(range(0, int(np.floor(n / 2)) + 1))
-        b = reversed(range(1, int(np.floor(n / 2))))
-        b = [-i for i in b]
-        return a + b
-
-    def _pk2(kx, ky):
-        if kx == 0 and ky == 0:
-            return 0.0
-        val = np.sqrt(np.sqrt(kx**2 + ky**2) ** (-cluster_radius))
-        return val
-
-    # Generate amplitude for the given cluster_radius
-    map_rng = np.random.default_rng(123)
-    amplitude = np.zeros((n_cell_x, n_cell_y))
-    fft_indices_x = _fft_indices(n_cell_x)
-    fft_indices_y = _fft_indices(n_cell_y)
-
-    for i, kx in enumerate(fft_indices_x):
-        for j, ky in enumerate(fft_indices_y):
-            amplitude[i, j] = _pk2(kx, ky)
-
-    # Generate Gaussian random field
-    noise = np.fft.fft2(map_rng.normal(size=(n_cell_x, n_cell_y)))
-    random_field = np.fft.ifft2(noise * amplitude).real
-    normalized_random_field = (random_field - np.min(random_field)) / (
-        np.max(random_field) - np.min(random_field)
+    # Generate Gaussian random fields
+    random_fields = np.fft.irfft2(
+        np.fft.rfft2(noise) * grf_amplitude(cluster_radius, n_cell), s=n_cell
     )
+    field_min = np.min(random_fields, axis=(1, 2), keepdims=True)
+    field_max = np.max(random_fields, axis=(1, 2), keepdims=True)
+    normalized_random_fields = (random_fields - field_min) / (field_max - field_min)
 
-    # Make field binary
-    normalized_random_field[normalized_random_field >= 0.5] = 1
-    normalized_random_field[normalized_random_field < 0.5] = 0
+    # Make fields binary
+    return (normalized_random_fields >= GRF_THRESHOLD).astype(np.uint8)
 
-    binary_field = normalized_random_field.astype(np.uint8)
 
-    return binary_field
+def gaussian_random_field_bank(path, cluster_radius, n_cell, seeds, batch_size=32):
+    """
+    Memory-mapped .npy bank of the fields of the given seeds, of shape
+    (len(seeds), n_cell_x, n_cell_y), generated batch_size fields at a time.
+    The FieldCache.key of the parameters is kept next to it in path + ".key":
+    an existing bank at path is reused only if it was built with the same
+    parameters.
+
+    Returns:
+    - read-only np.memmap, bank[k] being the field of seeds[k].
+    """
+    shape = (len(seeds), *n_cell)
+    key = FieldCache.key(
+        generator="gaussian_random_field_bank",
+        cluster_radius=float(cluster_radius),
+        shape=tuple(int(n) for n in n_cell),
+        seeds=tuple(int(seed) for seed in seeds),
+        threshold=GRF_THRESHOLD,
+    )
+    key_path = path + ".key"
+    if os.path.exists(path) and os.path.exists(key_path):
+        with open(key_path) as f:
+            if f.read().strip() == key:
+                return np.load(path, mmap_mode="r")
+
+    # filled in a temporary file moved to path once complete, so that an
+    # interrupted generation never leaves a partial bank to be reused; the
+    # stale key goes first so that it never describes the new bank
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if os.path.exists(key_path):
+        os.remove(key_path)
+    with atomic_write(path) as tmp_path:
+        bank = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.uint8, shape=shape
+        )
+        for start in range(0, len(seeds), batch_size):
+            batch_seeds = seeds[start : start + batch_size]
+            bank[start : start + len(batch_seeds)] = gaussian_random_fields(
+                cluster_radius, n_cell, batch_seeds
+            )
+        bank.flush()
+        del bank
+    with atomic_write(key_path) as tmp_path:
+        with open(tmp_path, "w") as f:
+            f.write(key + "\n")
+    return np.load(path, mmap_mode="r")
 
 
-def sample_binary_observations(belief_map, altitude, num_samples=5):
+def noisy_observations(submap, sigma0, sigma1, rng):
+    """
+    Binary observation of the binary submap through the sensor model: m = 0
+    is seen as 0 with probability 1 - sigma0, m = 1 as 1 with 1 - sigma1,
+    one uniform draw of rng per cell.
+
+    Returns:
+    - uint8 array of the shape of submap.
+    """
+    random_values = rng.random(submap.shape)
+    success0 = random_values <= 1.0 - sigma0
+    success1 = random_values <= 1.0 - sigma1
+    return np.where(submap == 0, ~success0, success1).astype(np.uint8)
+
+
+def clipped_normal_mean(p, noise_std):
+    """
+    E[clip(X, 0, 1)] for X ~ N(p, noise_std^2), elementwise in closed form.
+    """
+    p = np.asarray(p, dtype=float)
+    if noise_std == 0.0:
+        return np.clip(p, 0.0, 1.0)
+    # = p P(0 < X < 1) + noise_std (pdf(lo) - pdf(hi)) + P(X >= 1)
+    lo = -p / noise_std
+    hi = (1.0 - p) / noise_std
+    cdf_hi = ndtr(hi)
+    q = (
+        p * (cdf_hi - ndtr(lo))
+        + noise_std * (np.exp(-0.5 * lo**2) - np.exp(-0.5 * hi**2)) / np.sqrt(2 * np.pi)
+        + (1.0 - cdf_hi)
+    )
+    return np.clip(q, 0.0, 1.0)
+
+
+def sample_binary_observations(belief_map, altitude, num_samples=5, rng=None):
     """
     Samples binary observations from a belief map with noise based on altitude.
 
+    Each of the num_samples observations of a cell is Bernoulli(clip(p + e))
+    with fresh Gaussian noise e, so they are i.i.d. Bernoulli(q) with
+    q = E[clip(p + e, 0, 1)]: their sum is drawn as one Binomial(num_samples, q)
+    per cell, without the (m, n, num_samples) stack of samples.
+
     Args:
-        belief_map (np.ndarray): Belief map of shape (m, n, 2), where belief_map[..., 1] is P(m=1).
+        belief_map (np.ndarray): Belief map of shape (m, n), P(m=1).
         altitude (float): UAV altitude affecting noise level.
         num_samples (int): Number of samples for averaging.
-        noise_factor (float): Base noise factor scaled with altitude.
+        rng (np.random.Generator): random generator (default: a new one).
 
     Returns:
         np.ndarray: Averaged binary observation map of shape (m, n).
     """
-    m, n = belief_map.shape
-    sampled_observations = np.zeros((m, n, num_samples))
+    if rng is None:
+        rng = np.random.default_rng()
     a = 0.2
     b = 0.05
     var = a * (1 - np.exp(-b * altitude))
     noise_std = np.sqrt(var)
 
-    for i in range(num_samples):
-        # Sample from the probability map with added Gaussian noise
-        noise = np.random.normal(loc=0.0, scale=noise_std, size=(m, n))
-        noisy_prob = belief_map + noise  # Add noise to P(m=1)
-        noisy_prob = np.clip(noisy_prob, 0, 1)  # Ensure probabilities are valid
-
-        # Sample binary observation
-        sampled_observations[..., i] = np.random.binomial(1, noisy_prob)
+    q = clipped_normal_mean(belief_map, noise_std)
 
     # Return the averaged observation map
-    return np.mean(sampled_observations, axis=-1)
+    return rng.binomial(num_samples, q) / num_samples
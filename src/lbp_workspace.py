@@ -0,0 +1,173 @@
+import numpy as np
+
+
+class LBPWorkspace:
+    """
+    Preallocated buffers for the 5-channel LBP message tensor (URDL + belief).
+
+    A sweep or a belief read over a footprint only writes into these buffers
+    and into the arrays passed in, so nothing is allocated per direction or
+    per iteration. Buffers are sized for the whole grid and viewed down to
+    the footprint shape on each call.
+    """
+
+    def __init__(self, grid_size):
+        self.N = grid_size
+        size = grid_size[0] * grid_size[1]
+        self._comp = np.empty(5 * size)  # 1 - msgs over the footprint
+        self._diff = np.empty(4 * (grid_size[0] + 2) * (grid_size[1] + 2))
+        self._mul_0 = np.empty(size)
+        self._mul_1 = np.empty(size)
+        self._msg_0 = np.empty(size)
+        self._msg_1 = np.empty(size)
+
+    @staticmethod
+    def _view(buffer, shape):
+        return buffer[: int(np.prod(shape))].reshape(shape)
+
+    @staticmethod
+    def footprint(fp_vertices_ij):
+        """
+        Rows and columns of the footprint.
+        """
+        I, J = 0, 1
+        return (
+            slice(fp_vertices_ij["ul"][I], fp_vertices_ij["bl"][I]),
+            slice(fp_vertices_ij["ul"][J], fp_vertices_ij["ur"][J]),
+        )
+
+    def region(self, fp_vertices_ij):
+        """
+        Rows and columns of the footprint grown by one cell on each side,
+        i.e. every cell whose messages can be written by a sweep.
+        """
+        I, J = 0, 1
+        return (
+            slice(
+                max(0, fp_vertices_ij["ul"][I] - 1),
+                min(self.N[0], fp_vertices_ij["bl"][I] + 1),
+            ),
+            slice(
+                max(0, fp_vertices_ij["ul"][J] - 1),
+                min(self.N[1], fp_vertices_ij["ur"][J] + 1),
+            ),
+        )
+
+    def _product(self, factors, channels, out):
+        np.multiply(factors[channels[0]], factors[channels[1]], out=out)
+        for c in channels[2:]:
+            np.multiply(out, factors[c], out=out)
+        return out
+
+    def sweep(
+        self,
+        msgs,
+        msgs_buffer,
+        psi,
+        fp_vertices_ij,
+        direction_to_slicing_data,
+        residual=False,
+    ):
+        """
+        One synchronous sweep of the four directional messages over the
+        footprint: new messages go to msgs_buffer, then the written region
+        is copied back into msgs.
+
+        Returns:
+            float or None: max absolute change of the messages if residual.
+        """
+        rows, cols = self.footprint(fp_vertices_ij)
+        msgs_fp = msgs[:, rows, cols]
+        shape = msgs_fp.shape[1:]
+
+        comp = self._view(self._comp, msgs_fp.shape)
+        np.subtract(1.0, msgs_fp, out=comp)
+        mul_0 = self._view(self._mul_0, shape)
+        mul_1 = self._view(self._mul_1, shape)
+        msg_0 = self._view(self._msg_0, shape)
+        msg_1 = self._view(self._msg_1, shape)
+
+        for direction, data in direction_to_slicing_data.items():
+            channels = data["product_slice"](fp_vertices_ij)[0]
+            read_slice = data["read_slice"](fp_vertices_ij)
+            write_slice = data["write_slice"](fp_vertices_ij)
+
+            # elementwise multiplication of msgs
+            self._product(comp, channels, mul_0)
+            self._product(msgs_fp, channels, mul_1)
+
+            # matrix-vector multiplication (factor-msg)
+            np.multiply(mul_0, psi[0, 0], out=msg_0)
+            np.multiply(mul_0, psi[1, 0], out=msg_1)
+            np.multiply(mul_1, psi[0, 1], out=mul_0)
+            np.multiply(mul_1, psi[1, 1], out=mul_1)
+            np.add(msg_0, mul_0, out=msg_0)
+            np.add(msg_1, mul_1, out=msg_1)
+
+            # normalize the first coordinate of the msg
+            np.add(msg_0, msg_1, out=msg_0)
+            np.divide(msg_1, msg_0, out=msg_1)
+
+            # buffering
+            np.copyto(msgs_buffer[write_slice], msg_1[read_slice])
+
+        rows, cols = self.region(fp_vertices_ij)
+        change = None
+        if residual:
+            diff = self._view(self._diff, msgs[:4, rows, cols].shape)
+            np.subtract(msgs_buffer[:4, rows, cols], msgs[:4, rows, cols], out=diff)
+            np.abs(diff, out=diff)
+            change = np.max(diff, initial=0.0)
+
+        # copy the first 4 channels only
+        # the 5th one is the map belief
+        np.copyto(msgs[:4, rows, cols], msgs_buffer[:4, rows, cols])
+        return change
+
+    def belief(self, msgs, fp_vertices_ij, out):
+        """
+        Write the normalized product of all 5 channels over the footprint
+        into out (a view of the belief map restricted to the footprint).
+        """
+        rows, cols = self.footprint(fp_vertices_ij)
+        msgs_fp = msgs[:, rows, cols]
+        shape = msgs_fp.shape[1:]
+        channels = tuple(range(msgs_fp.shape[0]))
+
+        comp = self._view(self._comp, msgs_fp.shape)
+        np.subtract(1.0, msgs_fp, out=comp)
+        bel_0 = self._product(comp, channels, self._view(self._mul_0, shape))
+        bel_1 = self._product(msgs_fp, channels, self._view(self._mul_1, shape))
+
+        np.add(bel_0, bel_1, out=bel_0)
+        np.divide(bel_1, bel_0, out=out)
+        return out
+
+    def belief_log_odds(self, msgs, fp_vertices_ij, out):
+        """
+        Add the log-odds of the four directional messages over the footprint
+        to out (a view of the log-odds map restricted to the footprint). The
+        5th channel is not read: its log-odds is what out already holds.
+        """
+        rows, cols = self.footprint(fp_vertices_ij)
+        msgs_fp = msgs[:4, rows, cols]
+
+        logit = self._view(self._comp, msgs_fp.shape)
+        np.subtract(1.0, msgs_fp, out=logit)
+        np.divide(msgs_fp, logit, out=logit)
+        np.log(logit, out=logit)
+        for c in range(logit.shape[0]):
+            np.add(out, logit[c], out=out)
+        return out
+
+
+def log_odds_to_prob(log_odds, out=None):
+    """
+    Logistic function written as 0.5 * (1 + tanh(l / 2)), which does not
+    overflow for saturated cells.
+    """
+    out = np.multiply(log_odds, 0.5, out=out)
+    np.tanh(out, out=out)
+    np.add(out, 1.0, out=out)
+    np.multiply(out, 0.5, out=out)
+    return out
@@ -5,6 +5,7 @@ from helper import (
     FastLogger,
     compute_metrics,
     observed_m_ids,
+    set_validation_level,
     uav_position,
 )
 from orthomap import Field
@@ -27,6 +28,24 @@ correlation_types = ["adaptive"]
 n_steps = 100
 iters = 1
 es = [0.3]
+# LBP: max sweeps per step, residual tolerance (None = fixed sweeps), warm messages
+lbp_max_iterations = 1
+lbp_tol = None
+lbp_warm_start = False
+# store the map as log-odds (probabilities are computed in get_belief only)
+log_odds_belief = False
+# "ig_horizon" and "mcts" strategies: lookahead depth, search time budget [s]
+# per step and MCTS iteration cap
+planning_horizon = 3
+planning_time_budget = None
+mcts_iterations = 1000
+# quantize the belief to 2**bits levels for the IG lookup tables (None = exact)
+ig_lut_bits = None
+# directory of the persistent Gaussian field cache (None = no cache)
+field_cache_dir = None
+# hot-path invariant checks: "off", "cheap" (final outputs only) or "full"
+validation_level = "cheap"
+set_validation_level(validation_level)
 
 if field_type == "Ortomap":
     grf_r = "orto"
@@ -55,6 +74,8 @@ else:
 
 
 # use_sensor_model = False
+# exact s0, s1 of the sensor model instead of estimating them from samples
+analytic_sensor_model = False
 
 
 seed = 123
@@ -63,8 +84,14 @@ rng = np.random.default_rng(seed)
 
 camera1 = camera(grid_info, 60, rng=rng, camera_altitude=min_alt)
 map = Field(
-    grid_info, field_type, sweep=action_select_strategy, h_range=camera1.get_hrange()
+    grid_info,
+    field_type,
+    sweep=action_select_strategy,
+    h_range=camera1.get_hrange(),
+    field_cache_dir=field_cache_dir,
 )
+# Gaussian fields of the runs (seeds seed..seed+iters-1), generated once
+map.init_field_bank(iters)
 
 for correlation_type in tqdm(correlation_types, desc="pairwise", position=0):
     for sampled_sigma_error_margin in tqdm(
@@ -81,7 +108,7 @@ for correlation_type in tqdm(correlation_types, desc="pairwise", position=0):
                 desktop
                 + f"/txt/{correlation_type}_{action_select_strategy}_e{sampled_sigma_error_margin}_r{grf_r}"
             )
-            map.reset()
+            map.reset(run_id=iter)
             ground_truth_map = map.get_ground_truth()
             belief_map = np.full((grid_info.shape[0], grid_info.shape[1], 2), 0.5)
             assert ground_truth_map.shape == belief_map[:, :, 0].shape
@@ -93,13 +120,19 @@ for correlation_type in tqdm(correlation_types, desc="pairwise", position=0):
                     # camera1.get_hrange(),
                     e=sampled_sigma_error_margin,
                     sensor=use_sensor_model,
+                    analytic=analytic_sensor_model,
+                    seed=map.seed + iter,
                 )
                 # print(conf_dict)
                 # print(f"h_range: {camera1.get_hrange()}")
             else:
                 conf_dict = None
             occupancy_map = OML(
-                grid_info.shape, conf_dict=conf_dict, correlation_type=correlation_type
+                grid_info.shape,
+                conf_dict=conf_dict,
+                correlation_type=correlation_type,
+                log_odds=log_odds_belief,
+                rng=rng,
             )
 
             planner_mine = planning(
@@ -108,6 +141,11 @@ for correlation_type in tqdm(correlation_types, desc="pairwise", position=0):
                 action_select_strategy,
                 conf_dict=conf_dict,
                 optimal_alt=min_alt,
+                ig_lut_bits=ig_lut_bits,
+                horizon=planning_horizon,
+                time_budget=planning_time_budget,
+                mcts_iterations=mcts_iterations,
+                rng=rng,
             )
             if start == "border":
                 start_pos = random.choice(
@@ -195,7 +233,12 @@ for correlation_type in tqdm(correlation_types, desc="pairwise", position=0):
 
                 occupancy_map.update_belief_OG(fp_vertices_ij, submap, uav_pos)
                 occupancy_map.propagate_messages_(
-                    fp_vertices_ij, submap, uav_pos, max_iterations=1
+                    fp_vertices_ij,
+                    submap,
+                    uav_pos,
+                    max_iterations=lbp_max_iterations,
+                    tol=lbp_tol,
+                    warm_start=lbp_warm_start,
                 )
 
                 # Extract the beliefs
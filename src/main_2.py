@@ -55,6 +55,8 @@ else:
 
 
 # use_sensor_model = False
+# exact s0, s1 of the sensor model instead of estimating them from samples
+analytic_sensor_model = False
 
 
 seed = 123
@@ -65,6 +67,8 @@ camera1 = camera(grid_info, 60, rng=rng, camera_altitude=min_alt)
 map = Field(
     grid_info, field_type, sweep=action_select_strategy, h_range=camera1.get_hrange()
 )
+# Gaussian fields of the runs (seeds seed..seed+iters-1), generated once
+map.init_field_bank(iters)
 
 for correlation_type in tqdm(correlation_types, desc="pairwise", position=0):
     for sampled_sigma_error_margin in tqdm(
@@ -81,7 +85,7 @@ for correlation_type in tqdm(correlation_types, desc="pairwise", position=0):
                 desktop
                 + f"/txt/{correlation_type}_{action_select_strategy}_e{sampled_sigma_error_margin}_r{grf_r}"
             )
-            map.reset()
+            map.reset(run_id=iter)
             ground_truth_map = map.get_ground_truth()
             belief_map = np.full((grid_info.shape[0], grid_info.shape[1], 2), 0.5)
             assert ground_truth_map.shape == belief_map[:, :, 0].shape
@@ -93,6 +97,8 @@ for correlation_type in tqdm(correlation_types, desc="pairwise", position=0):
                     # camera1.get_hrange(),
                     e=sampled_sigma_error_margin,
                     sensor=use_sensor_model,
+                    analytic=analytic_sensor_model,
+                    seed=map.seed + iter,
                 )
                 # print(conf_dict)
                 # print(f"h_range: {camera1.get_hrange()}")
@@ -1,11 +1,19 @@
 from typing import Dict, List
 import numpy as np
 import math
-from helper import adaptive_weights_matrix
+from helper import adaptive_weights_matrix, sample_binary_observations, validate
+from lbp_workspace import LBPWorkspace, log_odds_to_prob
 
 
 class OccupancyMap:
-    def __init__(self, grid_size, conf_dict=None, correlation_type=None):
+    def __init__(
+        self,
+        grid_size,
+        conf_dict=None,
+        correlation_type=None,
+        log_odds=False,
+        rng=None,
+    ):
         self.N = grid_size  # Grid size (100x100)
         self.states = [0, 1]  # Possible states
         self.conf_dict = conf_dict
@@ -15,19 +23,62 @@ class OccupancyMap:
         self.msgs = None
         self.msgs_buffer = None
         self.direction_to_slicing_data = None
+        self.workspace = LBPWorkspace(self.N)
         self._init_LBP_msgs()
         self.map_beliefs = np.full((self.N[0], self.N[1]), 0.5)
         self.correlation_type = correlation_type
+        # random generator of the simulated (mexgen) observations
+        self.rng = rng if rng is not None else np.random.default_rng()
 
         self.sigma0 = None
         self.sigma1 = None
 
+        self.n_iterations = 0
+        self.residual = np.inf
+
+        # log-odds storage: beliefs live in self.log_odds and map_beliefs is
+        # only refreshed by get_belief()
+        self.use_log_odds = log_odds
+        self.log_odds = np.zeros((self.N[0], self.N[1]))
+        self._init_llr_tables()
+
     def reset(self, conf_dict=None):
         self.conf_dict = conf_dict
         self.phi = np.full((self.N[0], self.N[1], 2), 0.5)  # 2 states: [0, 1]
         self.last_observations = np.array([])
         self._init_LBP_msgs()
         self.map_beliefs = np.full((self.N[0], self.N[1]), 0.5)
+        self.log_odds = np.zeros((self.N[0], self.N[1]))
+        self._init_llr_tables()
+
+    def _sigmas(self, altitude):
+        """
+        Sensor FP/FN rates (s0, s1) at the given altitude.
+        """
+        if self.conf_dict is not None:
+            return self.conf_dict[np.round(altitude, decimals=2)]
+        a, b = 1, 0.015
+        sigma = a * (1 - np.exp(-b * altitude))  # Error parameter based on altitude
+        return sigma, sigma
+
+    def _init_llr_tables(self):
+        self.llr_tables = {}
+        if self.conf_dict is not None:
+            for altitude in self.conf_dict:
+                self._llr_table(altitude)
+
+    def _llr_table(self, altitude):
+        """
+        Log-likelihood ratio log p(z|m=1) - log p(z|m=0) for z = 0, 1,
+        cached per altitude so a log-odds update is a gather and an add.
+        """
+        key = np.round(altitude, decimals=2)
+        if key not in self.llr_tables:
+            s0, s1 = np.clip(self._sigmas(altitude), 1e-12, 1.0 - 1e-12)
+            self.llr_tables[key] = np.array(
+                [np.log(s1) - np.log1p(-s0), np.log1p(-s1) - np.log(s0)]
+            )
+        return self.llr_tables[key]
 
     def _init_LBP_msgs(self):
         # n_cell = self.N
@@ -172,6 +223,8 @@ class OccupancyMap:
     # def update_belief_OG(self, zx, zy, z, uav_pos, mexgen=None):
     def update_belief_OG(self, fp_vertices_ij, z, uav_pos, mexgen=None):
         I, J = 0, 1
+        if self.use_log_odds:
+            return self._update_log_odds(fp_vertices_ij, z, uav_pos, mexgen)
         if mexgen == None:
             a, b = 1, 0.015
             sigma = a * (
@@ -198,12 +251,13 @@ class OccupancyMap:
             likelihood_m_one = self.sample_binary_observations(z, uav_pos.altitude)
             likelihood_m_zero = 1 - likelihood_m_one
 
-        assert np.all(np.greater_equal(likelihood_m_one, 0.0)) and np.all(
-            np.less_equal(likelihood_m_one, 1.0)
-        )
-        assert np.all(np.greater_equal(likelihood_m_zero, 0.0)) and np.all(
-            np.less_equal(likelihood_m_zero, 1.0)
-        )
+        if validate("full"):
+            assert np.all(np.greater_equal(likelihood_m_one, 0.0)) and np.all(
+                np.less_equal(likelihood_m_one, 1.0)
+            )
+            assert np.all(np.greater_equal(likelihood_m_zero, 0.0)) and np.all(
+                np.less_equal(likelihood_m_zero, 1.0)
+            )
 
         posterior_m_zero = likelihood_m_zero * (
             1.0
@@ -220,30 +274,67 @@ class OccupancyMap:
             ]
         )
 
-        assert np.all(np.greater_equal(posterior_m_zero, 0.0))
-        assert np.all(np.less_equal(posterior_m_zero, 1.0))
+        if validate("full"):
+            assert np.all(np.greater_equal(posterior_m_zero, 0.0))
+            assert np.all(np.less_equal(posterior_m_zero, 1.0))
 
-        assert np.all(np.greater_equal(posterior_m_one, 0.0))
-        assert np.all(np.less_equal(posterior_m_one, 1.0))
+            assert np.all(np.greater_equal(posterior_m_one, 0.0))
+            assert np.all(np.less_equal(posterior_m_one, 1.0))
         epsilon = 1e-20  # A small constant to prevent division by zero
 
         # Normalize posterior_m_one
         denominator = posterior_m_zero + posterior_m_one
-        assert np.all(np.greater_equal(denominator, 0.0))  # Optional sanity check
+        if validate("full"):
+            assert np.all(np.greater_equal(denominator, 0.0))  # Optional sanity check
         posterior_m_one_norm = posterior_m_one / (denominator + epsilon)
 
         # Recheck the normalization
-        assert np.all(np.greater_equal(posterior_m_one_norm, 0.0))
-        assert np.all(np.less_equal(posterior_m_one_norm, 1.0))
+        if validate("cheap"):
+            assert np.all(np.greater_equal(posterior_m_one_norm, 0.0))
+            assert np.all(np.less_equal(posterior_m_one_norm, 1.0))
 
         self.map_beliefs[
             fp_vertices_ij["ul"][I] : fp_vertices_ij["bl"][I],
             fp_vertices_ij["ul"][J] : fp_vertices_ij["ur"][J],
         ] = posterior_m_one_norm
 
+    def _update_log_odds(self, fp_vertices_ij, z, uav_pos, mexgen=None):
+        rows, cols = self.workspace.footprint(fp_vertices_ij)
+        if mexgen == None:
+            self.sigma0, self.sigma1 = self._sigmas(uav_pos.altitude)
+            llr = self._llr_table(uav_pos.altitude)[z]
+        else:
+            likelihood_m_one = np.clip(
+                self.sample_binary_observations(z, uav_pos.altitude), 1e-12, 1 - 1e-12
+            )
+            llr = np.log(likelihood_m_one) - np.log1p(-likelihood_m_one)
+
+        self.log_odds[rows, cols] += llr
+
     def propagate_messages_(
-        self, fp_vertices_ij, z, uav_pos, max_iterations=5, correlation_type=None
+        self,
+        fp_vertices_ij,
+        z,
+        uav_pos,
+        max_iterations=5,
+        correlation_type=None,
+        tol=None,
+        warm_start=False,
     ):
+        """
+        Loopy belief propagation over the footprint.
+
+        Args:
+            max_iterations (int): upper bound on the number of sweeps.
+            tol (float): if given, stop as soon as the max absolute change of
+                the messages in a sweep drops below it.
+            warm_start (bool): keep the messages of the previous step instead
+                of resetting them to 0.5.
+
+        Returns:
+            int: number of sweeps actually run (also kept in self.n_iterations,
+            the last residual in self.residual).
+        """
         # Pairwise potential
         # self.update_belief_OG(zx, zy, z, uav_pos)
         self.last_observations = z
@@ -253,47 +344,53 @@ class OccupancyMap:
         psi = self.pairwise_potential(correlation_type)
 
         # fp_vertices_ij = self.get_indices(zx, zy)
-        # reset msgs and msgs_buffer
-        self.msgs = np.ones_like(self.msgs) * 0.5
-        self.msgs_buffer = np.ones_like(self.msgs) * 0.5
-        self.msgs[4, :, :] = self.map_beliefs[
-            :, :
-        ]  # set msgs last channel with current map belief
+        if not warm_start:
+            # reset msgs and msgs_buffer
+            self.msgs.fill(0.5)
+            self.msgs_buffer.fill(0.5)
+        rows, cols = self.workspace.footprint(fp_vertices_ij)
+        # set msgs last channel with current map belief
+        if self.use_log_odds:
+            log_odds_to_prob(self.log_odds[rows, cols], out=self.msgs[4, rows, cols])
+        else:
+            np.copyto(self.msgs[4, rows, cols], self.map_beliefs[rows, cols])
+        n_iterations = 0
+        residual = np.inf
         for _ in range(max_iterations):
-            for direction, data in self.direction_to_slicing_data.items():
-                # print(direction)
-                product_slice = data["product_slice"](fp_vertices_ij)
-                read_slice = data["read_slice"](fp_vertices_ij)
-                write_slice = data["write_slice"](fp_vertices_ij)
-
-                # elementwise multiplication of msgs
-                mul_0 = np.prod(1 - self.msgs[product_slice], axis=0)
-                mul_1 = np.prod(self.msgs[product_slice], axis=0)
+            change = self.workspace.sweep(
+                self.msgs,
+                self.msgs_buffer,
+                psi,
+                fp_vertices_ij,
+                self.direction_to_slicing_data,
+                residual=tol is not None,
+            )
+            n_iterations += 1
 
-                # matrix-vector multiplication (factor-msg)
-                msg_0 = psi[0, 0] * mul_0 + psi[0, 1] * mul_1
-                msg_1 = psi[1, 0] * mul_0 + psi[1, 1] * mul_1
+            if tol is not None:
+                residual = change
+                if residual < tol:
+                    break
 
-                # normalize the first coordinate of the msg
-                norm_msg_1 = msg_1 / (msg_0 + msg_1)
-                # buffering
-                self.msgs_buffer[write_slice] = norm_msg_1[read_slice]
+        self.n_iterations = n_iterations
+        self.residual = residual
 
-            # copy the first 4 channels only
-            # the 5th one is the map belief
-            self.msgs[:4, :, :] = self.msgs_buffer[:4, :, :]
+        if self.use_log_odds:
+            self.workspace.belief_log_odds(
+                self.msgs, fp_vertices_ij, out=self.log_odds[rows, cols]
+            )
+            return n_iterations
 
-        bel_0 = np.prod(1 - self.msgs[:, product_slice[1], product_slice[2]], axis=0)
-        bel_1 = np.prod(self.msgs[:, product_slice[1], product_slice[2]], axis=0)
+        self.workspace.belief(
+            self.msgs, fp_vertices_ij, out=self.map_beliefs[rows, cols]
+        )
 
-        # norm_bel_0 = bel_0 / (bel_0 + bel_1)
-        self.map_beliefs[product_slice[1], product_slice[2]] = bel_1 / (bel_0 + bel_1)
+        if validate("cheap"):
+            assert np.all(np.greater_equal(self.map_beliefs[rows, cols], 0.0)) and (
+                np.all(np.less_equal(self.map_beliefs[rows, cols], 1.0))
+            )
 
-        assert np.all(
-            np.greater_equal(self.map_beliefs[product_slice[1], product_slice[2]], 0.0)
-        ) and np.all(
-            np.less_equal(self.map_beliefs[product_slice[1], product_slice[2]], 1.0)
-        )
+        return n_iterations
 
     def update_news_belief_LBP_and_fuse_single(self, zx, zy, z):
 
@@ -419,37 +516,15 @@ class OccupancyMap:
             #     news_map_beliefs[agent_id, agent_id, :, :] = 0.5
 
     def get_belief(self):
+        if self.use_log_odds:
+            log_odds_to_prob(self.log_odds, out=self.map_beliefs)
         return self.map_beliefs
 
     def sample_binary_observations(self, belief_map, altitude, num_samples=5):
         """
-        Samples binary observations from a belief map with noise based on altitude.
-
-        Args:
-            belief_map (np.ndarray): Belief map of shape (m, n, 2), where belief_map[..., 1] is P(m=1).
-            altitude (float): UAV altitude affecting noise level.
-            num_samples (int): Number of samples for averaging.
-            noise_factor (float): Base noise factor scaled with altitude.
-
-        Returns:
-            np.ndarray: Averaged binary observation map of shape (m, n).
+        Averaged simulated binary observations of belief_map (P(m=1)) from
+        altitude, see helper.sample_binary_observations.
         """
-        m, n = belief_map.shape
-        sampled_observations = np.zeros((m, n, num_samples))
-        a = 0.2
-        b = 0.05
-        var = a * (1 - np.exp(-b * altitude))
-        noise_std = np.sqrt(var)
-        # noise_std = noise_factor * altitude  # Noise increases with altitude
-
-        for i in range(num_samples):
-            # Sample from the probability map with added Gaussian noise
-            noise = np.random.normal(loc=0.0, scale=noise_std, size=(m, n))
-            noisy_prob = belief_map + noise  # Add noise to P(m=1)
-            noisy_prob = np.clip(noisy_prob, 0, 1)  # Ensure probabilities are valid
-
-            # Sample binary observation
-            sampled_observations[..., i] = np.random.binomial(1, noisy_prob)
-
-        # Return the averaged observation map
-        return np.mean(sampled_observations, axis=-1)
+        return sample_binary_observations(
+            belief_map, altitude, num_samples=num_samples, rng=self.rng
+        )
@@ -1,24 +1,31 @@
 #!/usr/bin/env python3
-import pickle
 import random
 import sys
 import os
 import math
+import hashlib
+import pickle
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import cv2
 from sklearn.metrics import confusion_matrix
 
-from helper import gaussian_random_field
+from helper import (
+    BitMap,
+    FieldCache,
+    atomic_write,
+    gaussian_random_field,
+    gaussian_random_field_bank,
+    noisy_observations,
+)
 
 sys.path.append(os.path.abspath("/home/bota/Desktop/active_sensing"))
-from binary_classifier.classifier import Predicter
+from binary_classifier.chip_store import ChipStore
+from binary_classifier.orthomap_reader import OrthomapReader
 
 # dataset
 from PIL import Image, ImageFilter
-from osgeo import gdal
-
-gdal.UseExceptions()  # Enable exceptions to avoid the warning
 
 desktop = "/home/bota/Desktop/active_sensing"
 annotation_path = desktop + "/src/annotation.txt"
@@ -30,6 +37,43 @@ model_path = (
 cache_dir = desktop + "/data/predictions_cache/"
 
 
+# resampling filters of PIL: (support, weight function)
+RESAMPLING_FILTERS = {
+    "bilinear": (1.0, lambda x: np.clip(1 - np.abs(x), 0, None)),
+    "lanczos": (3.0, lambda x: np.where(np.abs(x) < 3, np.sinc(x) * np.sinc(x / 3), 0)),
+}
+
+
+def resampling_matrix(in_size, out_size, resample="lanczos"):
+    """
+    (out_size, in_size) matrix resizing a signal as PIL's resize does along
+    one axis (antialiased when downsampling).
+    """
+    support, weight = RESAMPLING_FILTERS[resample]
+    scale = in_size / out_size
+    filter_scale = max(scale, 1.0)
+    centers = (np.arange(out_size) + 0.5) * scale
+    x = (np.arange(in_size)[None, :] + 0.5 - centers[:, None]) / filter_scale
+    matrix = np.where(np.abs(x) <= support, weight(x), 0.0)
+    return matrix / matrix.sum(axis=1, keepdims=True)
+
+
+def gaussian_blur_matrix(size, sigma):
+    """
+    (size, size) matrix of a 1D Gaussian blur of standard deviation sigma,
+    edges replicated as PIL's GaussianBlur.
+    """
+    radius = int(math.ceil(3 * sigma))
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+    kernel /= kernel.sum()
+    matrix = np.zeros((size, size))
+    rows = np.repeat(np.arange(size), len(offsets))
+    cols = np.clip(rows + np.tile(offsets, size), 0, size - 1)
+    np.add.at(matrix, (rows, cols), np.tile(kernel, size))
+    return matrix
+
+
 class img_sampler:
     def __init__(self):
         self.focal_length = 0.01229  # 12.29mm lens in meters
@@ -136,6 +180,48 @@ class img_sampler:
         else:
             return image
 
+    def _axis_matrices(self, in_shape, alt, out_size=None):
+        """
+        (rows, cols) matrices of img_at_alt along each image axis, followed by
+        a bilinear resize to (out_size, out_size) as transforms.Resize does.
+        """
+        height, width = in_shape
+        matrices = [np.eye(height), np.eye(width)]
+        if alt is not None:
+            target_w, target_h = self.calculate_tile_size_on_image(alt)
+            if target_w < width and target_h < height:
+                blur_radius = max(0.5, abs(target_w - width) / 50)
+                matrices = [
+                    resampling_matrix(size, target)
+                    @ gaussian_blur_matrix(size, blur_radius)
+                    for size, target in ((height, target_h), (width, target_w))
+                ]
+        if out_size is not None:
+            matrices = [
+                resampling_matrix(len(matrix), out_size, "bilinear") @ matrix
+                for matrix in matrices
+            ]
+        return [matrix.astype(np.float32) for matrix in matrices]
+
+    def batch_at_alt(self, images, alt=None, out_size=None):
+        """
+        img_at_alt of a stack of same-size images at once, the separable blur
+        and resampling being applied as matrix products along each axis, and
+        optionally resized to the classifier input in the same products
+        instead of a PIL round trip per tile.
+
+        Args:
+            images: (N, H, W, 3) uint8 RGB images.
+            alt: altitude to degrade to, None to only resize.
+            out_size: side of the output images, None to keep img_at_alt's.
+
+        Returns:
+            np.ndarray: (N, 3, h, w) float32 images, values in [0, 255].
+        """
+        rows, cols = self._axis_matrices(images.shape[1:3], alt, out_size)
+        channels = np.moveaxis(images, -1, 1).astype(np.float32)
+        return rows @ channels @ cols.T
+
 
 class Field:
     def __init__(
@@ -150,10 +236,41 @@ class Field:
         a=1,
         b=0.015,
         h_range=[],
+        field_cache_dir=None,
+        prediction_batch_size=256,
+        prediction_workers=None,
+        lazy_predictions=False,
+        ortomap_block_size=1024,
+        ortomap_cache_blocks=64,
+        chip_store_dir=None,
+        predictor_backend="eager",
+        exported_model_path=None,
     ):
         self.grid_info = grid_info
+        # bit-packed ground truth, read and written through ground_truth_map
+        self.ground_truth = None
         self.seed = seed
         self.rng = np.random.default_rng(seed)
+        # init_s0_s1 results
+        self.conf_dict_cache = {}
+        # prediction cache construction: tiles per CNN forward pass and threads
+        # cropping / degrading tiles (None: ThreadPoolExecutor default)
+        self.prediction_batch_size = prediction_batch_size
+        self.prediction_workers = prediction_workers
+        # lazy mode: {altitude: predictions, NaN where not computed yet} of the
+        # altitudes missing from the cache, filled one footprint at a time
+        self.lazy = lazy_predictions
+        self.lazy_predictions = {}
+        # orthomosaic windowed reads: block side in pixels and blocks kept in memory
+        self.ortomap_block_size = ortomap_block_size
+        self.ortomap_cache_blocks = ortomap_cache_blocks
+        # pre-cut (and pre-degraded to self.altitudes) tiles, None: crop self.img
+        self.chip_store_dir = chip_store_dir
+        self.chips = None
+        # Predicter backend, see Predicter.export() for the exported model
+        self.predictor_backend = predictor_backend
+        self.exported_model_path = exported_model_path
+        self._predictor = None
         self.a = a
         self.b = b
         start = h_range[0]
@@ -170,19 +287,28 @@ class Field:
             # self.field_type = f"Gaussian_r{field_type}"
             self.field_type = "Gaussian"
             self.field_r = field_type
-            self.ground_truth_map = gaussian_random_field(self.field_r, grid_info.shape)
+            # persistent cache of the generated fields, None: no cache
+            self.field_cache = (
+                FieldCache(field_cache_dir) if field_cache_dir is not None else None
+            )
+            self.ground_truth_map = gaussian_random_field(
+                self.field_r, grid_info.shape, seed=self.seed, cache=self.field_cache
+            )
+            # fields of the runs, see init_field_bank()
+            self.field_bank = None
 
         elif field_type == "Ortomap":
             self.field_type = field_type
 
             self.model_path = model_path
+            self._model_hash = None
             self.ortomap_path = ortomap_path
             if not self.sweep:
                 self.cache_dir = cache_dir
                 os.makedirs(self.cache_dir, exist_ok=True)
+                self.img_sampler = img_sampler()
                 self._init_ortomap()
 
-                self.img_sampler = img_sampler()
                 self.predictions_cache = self._load_cache()
 
             else:
@@ -195,42 +321,229 @@ class Field:
                     for col in range(0, self.grid_info.x)
                 ]
 
-    def _cache_filepath(self):
-        return os.path.join(self.cache_dir, "predictions.pkl")
+    @property
+    def predictor(self):
+        """
+        Tile classifier, built on first use so that torch and torchvision are
+        only imported when tiles have to be classified.
+        """
+        if self._predictor is None:
+            from binary_classifier.classifier import Predicter
+
+            self._predictor = Predicter(
+                model_weights_path=self.model_path,
+                num_classes=2,
+                backend=self.predictor_backend,
+                exported_model_path=self.exported_model_path,
+            )
+        return self._predictor
+
+    @property
+    def ground_truth_map(self):
+        if self.ground_truth is None:
+            return None
+        return self.ground_truth.to_array()
+
+    @ground_truth_map.setter
+    def ground_truth_map(self, values):
+        self.ground_truth = None if values is None else BitMap.from_array(values)
+
+    def _weights_hash(self):
+        if self._model_hash is None:
+            digest = hashlib.sha256()
+            with open(self.model_path, "rb") as f:
+                for block in iter(lambda: f.read(2**20), b""):
+                    digest.update(block)
+            self._model_hash = digest.hexdigest()[:16]
+        return self._model_hash
+
+    def _shard_filepath(self, altitude):
+        return os.path.join(
+            self.cache_dir,
+            f"predictions_{self._weights_hash()}_alt{altitude:.2f}.npy",
+        )
 
     def _load_cache(self):
-        filepath = self._cache_filepath()
-        if os.path.exists(filepath):
-            with open(filepath, "rb") as f:
-                return pickle.load(f)
+        """
+        Predictions at every altitude, one bit-packed .npy shard per (model
+        weights, altitude) memory-mapped from cache_dir. Missing shards are
+        computed and written one altitude at a time, so an interrupted run
+        resumes from the last finished altitude. In lazy mode they are
+        computed by get_observations, only for the footprints visited.
+        """
+        self._import_legacy_cache()
         self.predictions_cache = {}
-        self._initialize_predictions()
+        for altitude in self.altitudes:
+            filepath = self._shard_filepath(altitude)
+            if os.path.exists(filepath):
+                self.predictions_cache[altitude] = BitMap(
+                    np.load(filepath, mmap_mode="r"), self.grid_info.shape
+                )
+        if self.lazy:
+            for altitude in self.altitudes:
+                if altitude not in self.predictions_cache:
+                    self.lazy_predictions[altitude] = np.full(
+                        self.grid_info.shape, np.nan, dtype=np.float32
+                    )
+        else:
+            self._initialize_predictions()
+        return self.predictions_cache
 
-        # return {}
+    def _import_legacy_cache(self):
+        """
+        One-time import of the single predictions.pkl of earlier versions into
+        shards of the current weights (the pickle does not record the weights
+        that produced it). A marker file with the weights hash keeps it from
+        being imported again, so shards of other weights are computed.
+        """
+        legacy_path = os.path.join(self.cache_dir, "predictions.pkl")
+        marker_path = legacy_path + ".imported"
+        if not os.path.exists(legacy_path) or os.path.exists(marker_path):
+            return
+        with open(legacy_path, "rb") as f:
+            legacy_cache = pickle.load(f)
+        for altitude, z in legacy_cache.items():
+            # caches written before predictions were bit-packed
+            predictions = z if isinstance(z, BitMap) else BitMap.from_array(z)
+            if predictions.shape != tuple(self.grid_info.shape):
+                continue
+            if not os.path.exists(self._shard_filepath(altitude)):
+                self._save_shard(altitude, predictions)
+        with open(marker_path, "w") as f:
+            f.write(self._weights_hash() + "\n")
 
-    def _save_cache(self):
-        with open(self._cache_filepath(), "wb") as f:
-            pickle.dump(self.predictions_cache, f)
+    def _save_shard(self, altitude, predictions):
+        with atomic_write(self._shard_filepath(altitude)) as tmp_path:
+            with open(tmp_path, "wb") as f:
+                np.save(f, predictions.packed)
 
-    def _initialize_predictions(self):
+    def _predict_footprint(self, altitude, i_min, i_max, j_min, j_max):
+        """
+        Lazy mode predictions in a footprint at altitude, the tiles not
+        predicted yet being classified in one batch. Once every tile of the
+        altitude is predicted, it moves to the cache and its shard is saved.
+        """
+        predictions = self.lazy_predictions[altitude]
+        window = predictions[i_min:i_max, j_min:j_max]
+        missing = np.argwhere(np.isnan(window))
+        if len(missing) > 0:
+            tiles = [(i_min + int(r), j_min + int(c)) for r, c in missing]
+            with ThreadPoolExecutor(max_workers=self.prediction_workers) as executor:
+                window[missing[:, 0], missing[:, 1]] = self._predict_tiles(
+                    tiles, altitude, executor
+                )
+        z = window.astype(np.uint8)
 
-        for altitude in self.altitudes:
-            z = np.zeros_like(self.ground_truth_map, dtype=int)
-            for ind, (r, c) in enumerate(self.tiles):
-                tile_pil_img = self._get_tile_img((r, c))
-                tile_pil_img = self.img_sampler.img_at_alt(tile_pil_img, altitude)
-                z.flat[ind] = int(self.predictor.predict(tile_pil_img))
+        if not np.isnan(predictions).any():
+            self.predictions_cache[altitude] = BitMap.from_array(predictions)
+            self._save_shard(altitude, self.predictions_cache[altitude])
+            del self.lazy_predictions[altitude]
+        return z
 
-            self.predictions_cache[altitude] = z
+    def _tile_array_at_alt(self, tile, altitude):
+        """
+        (chip, degraded): the tile pre-degraded to altitude from the chip
+        store if there, else the original tile.
+        """
+        if self.chips is not None:
+            chip = self.chips.chip(self._ortho_tile(tile), altitude)
+            if chip is not None:
+                return chip, True
+        return self._get_tile_array(tile), False
+
+    def _degrade_chip(self, chip, altitude):
+        # one image of batch_at_alt, as an (h, w, 3) uint8 chip
+        image = self.img_sampler.batch_at_alt(chip[None], altitude)[0]
+        return np.clip(np.rint(np.moveaxis(image, 0, -1)), 0, 255).astype(np.uint8)
+
+    def _predict_tiles(self, tiles, altitude, executor=None):
+        """
+        Labels of tiles at altitude. Tiles are read (by executor if given),
+        stacked by size, degraded and resized to the classifier input by
+        img_sampler.batch_at_alt and classified prediction_batch_size at a
+        time.
+        """
+        if executor is not None:
+            arrays = list(
+                executor.map(self._tile_array_at_alt, tiles, [altitude] * len(tiles))
+            )
+        else:
+            arrays = [self._tile_array_at_alt(tile, altitude) for tile in tiles]
+        groups = {}
+        for ind, (chip, degraded) in enumerate(arrays):
+            groups.setdefault((chip.shape, degraded), []).append(ind)
+
+        labels = np.empty(len(tiles), dtype=int)
+        batch_size = self.prediction_batch_size
+        for (_, degraded), inds in groups.items():
+            for start in range(0, len(inds), batch_size):
+                batch = inds[start : start + batch_size]
+                inputs = self.img_sampler.batch_at_alt(
+                    np.stack([arrays[ind][0] for ind in batch]),
+                    None if degraded else altitude,
+                    out_size=self.predictor.img_size,
+                )
+                labels[batch] = self.predictor.predict_input_labels(
+                    inputs, batch_size=batch_size
+                )
+        return labels
+
+    def _initialize_predictions(self):
+        """
+        Predictions of every tile at the altitudes missing from the cache:
+        tiles are read by a thread pool, prediction_batch_size at a time, and
+        degraded and classified in batches (_predict_tiles). Each altitude is
+        saved as soon as it is done.
+        """
+        missing = [h for h in self.altitudes if h not in self.predictions_cache]
+        if not missing:
+            return
+
+        batch_size = self.prediction_batch_size
+        with ThreadPoolExecutor(max_workers=self.prediction_workers) as executor:
+            for altitude in missing:
+                z = np.zeros(self.ground_truth.shape, dtype=np.uint8)
+                for start in range(0, len(self.tiles), batch_size):
+                    tiles = self.tiles[start : start + batch_size]
+                    z.flat[start : start + len(tiles)] = self._predict_tiles(
+                        tiles, altitude, executor
+                    )
 
-        self._save_cache()
+                self.predictions_cache[altitude] = BitMap.from_array(z)
+                self._save_shard(altitude, self.predictions_cache[altitude])
+
+    def init_field_bank(self, n_runs, bank_dir="cache"):
+        """
+        Generate (or reuse from bank_dir) the Gaussian fields of runs
+        0..n_runs-1, run i using seed self.seed + i, as a memory-mapped bank
+        read by reset(run_id).
+        """
+        if self.field_type != "Gaussian":
+            return
+        n_x, n_y = self.grid_info.shape
+        path = os.path.join(
+            bank_dir,
+            f"grf_r{self.field_r}_{n_x}x{n_y}_seeds{self.seed}-{self.seed + n_runs - 1}.npy",
+        )
+        self.field_bank = gaussian_random_field_bank(
+            path,
+            self.field_r,
+            self.grid_info.shape,
+            [self.seed + run_id for run_id in range(n_runs)],
+        )
 
-    def reset(self):
+    def reset(self, run_id=None):
         if self.field_type == "Gaussian":
             try:
-                self.ground_truth_map = gaussian_random_field(
-                    self.field_r, self.grid_info.shape
-                )
+                if self.field_bank is not None and run_id is not None:
+                    self.ground_truth_map = np.array(self.field_bank[run_id])
+                else:
+                    self.ground_truth_map = gaussian_random_field(
+                        self.field_r,
+                        self.grid_info.shape,
+                        seed=self.seed,
+                        cache=self.field_cache,
+                    )
                 self.rng = np.random.default_rng(self.seed)
             except Exception as e:
                 raise ValueError(
@@ -239,21 +552,24 @@ class Field:
 
     def _init_ortomap(self):
 
-        self.predictor = Predicter(model_weights_path=self.model_path, num_classes=2)
-        dataset = gdal.Open(self.ortomap_path)
-        band1 = dataset.GetRasterBand(1)  # Red channel
-        band2 = dataset.GetRasterBand(2)  # Green channel
-        band3 = dataset.GetRasterBand(3)  # Blue channel
-
-        b1 = band1.ReadAsArray()
-        b2 = band2.ReadAsArray()
-        b3 = band3.ReadAsArray()
-        self.img = np.dstack((b1, b2, b3))
+        self.img = OrthomapReader(
+            self.ortomap_path,
+            block_size=self.ortomap_block_size,
+            cache_blocks=self.ortomap_cache_blocks,
+        )
 
         self.tile_pixel_loc = self._parse_tile_file(tile_ortomappixel_path)
         self.ground_truth_map = self._read_annotations_to_matrix(annotation_path)
         # self.tiles = [(row, col) for row in range(3, 113) for col in range(13, 73)]
         self.tiles = [(row, col) for row in range(0, 110) for col in range(0, 60)]
+        if self.chip_store_dir is not None:
+            self.chips = ChipStore.build(
+                self.chip_store_dir,
+                self.img,
+                self.tile_pixel_loc,
+                altitudes=self.altitudes,
+                img_at_alt=self._degrade_chip,
+            )
 
     def _parse_tile_file(self, file_path):
         """
@@ -302,25 +618,28 @@ class Field:
         except Exception as e:
             raise ValueError(f"Error reading the file {file_path}: {e}")
 
+    def _ortho_tile(self, tile):
+        # grid cell to (row, col) of the tile file
+        return tile[0] + 3, tile[1] + 13
+
     def _get_orto_bbox(self, tile):
-        if isinstance(tile, tuple):
-            r, c = tile
-        else:
-            r, c = tile[0], tile[1]
-        r += 3
-        c += 13
+        r, c = self._ortho_tile(tile)
         tile_coords = self.tile_pixel_loc[r][c]
         x_range = slice(tile_coords[0][0], tile_coords[0][1])
         y_range = slice(tile_coords[1][0], tile_coords[1][1])
         return x_range, y_range
 
-    def _get_tile_img(self, tile):
+    def _get_tile_array(self, tile):
+        if self.chips is not None:
+            return self.chips.chip(self._ortho_tile(tile))
         x_range, y_range = self._get_orto_bbox(tile)
-        cropped_img = self.img[x_range, y_range, :]
-        return Image.fromarray(cropped_img)
+        return self.img[x_range, y_range, :]
+
+    def _get_tile_img(self, tile):
+        return Image.fromarray(self._get_tile_array(tile))
 
     def get_tile_info(self, tile):
-        return self.get_tile_img(tile), self.ground_truth_map[tile[0], tile[1]]
+        return self.get_tile_img(tile), self.ground_truth[tile[0], tile[1]]
 
     def convert_xy_ij(self, x, y):
         if self.grid_info.center:
@@ -380,42 +699,39 @@ class Field:
             "br": np.array([i_max, j_max]),
         }
 
-        if self.field_type == "Gaussian" and self.ground_truth_map is not None:
+        if self.field_type == "Gaussian" and self.ground_truth is not None:
             # get "perfect" observation from ground truth
-            submap = self.ground_truth_map[i_min:i_max, j_min:j_max]
+            submap = self.ground_truth[i_min:i_max, j_min:j_max]
             # add sigma noise to observation: if sigma not given, calculate it
             if sigmas is None:
                 sigma = self.a * (1 - np.exp(-self.b * uav_pos.altitude))
                 sigmas = [sigma, sigma]
 
             sigma0, sigma1 = sigmas[0], sigmas[1]
-            random_values = self.rng.random(submap.shape)
-            success0 = random_values <= 1.0 - sigma0
-            success1 = random_values <= 1.0 - sigma1
-            z0 = np.where(np.logical_and(success0, submap == 0), 0, 1)
-            z1 = np.where(np.logical_and(success1, submap == 1), 1, 0)
-            z = np.where(submap == 0, z0, z1)
+            z = noisy_observations(submap, sigma0, sigma1, self.rng)
 
         elif self.field_type == "Ortomap":
             x = np.arange(i_min, i_max, 1)
             y = np.arange(j_min, j_max, 1)
             x, y = np.meshgrid(x, y, indexing="ij")
-            z = np.zeros_like(x, dtype=int)
+            z = np.zeros_like(x, dtype=np.uint8)
             if self.sweep:
-                z = self.ground_truth_map[i_min:i_max, j_min:j_max]
+                z = self.ground_truth[i_min:i_max, j_min:j_max]
                 return fp_vertices_ij, z
-            if self.predictor is not None:
+            if self.model_path is not None:
                 # label = np.zeros_like(x, dtype=int)
-                if self.predictions_cache is not None:
-                    approx_alt = round(uav_pos.altitude, 2)
+                approx_alt = round(uav_pos.altitude, 2)
+                if approx_alt in self.lazy_predictions:
+                    z = self._predict_footprint(approx_alt, i_min, i_max, j_min, j_max)
+                elif self.predictions_cache is not None:
                     if not approx_alt in self.predictions_cache.keys():
                         print(f"uav alt:{uav_pos.altitude} and approx {approx_alt}")
                         print(f"pred cache alts: {list(self.predictions_cache.keys())}")
 
                     pred_at_alt = self.predictions_cache[approx_alt]
                     assert (
-                        pred_at_alt.shape == self.ground_truth_map.shape
-                    ), f"check prediction cache shape: its {pred_at_alt.shape} and gt shape {self.ground_truth_map.shape}"
+                        pred_at_alt.shape == self.ground_truth.shape
+                    ), f"check prediction cache shape: its {pred_at_alt.shape} and gt shape {self.ground_truth.shape}"
                     z = pred_at_alt[i_min:i_max, j_min:j_max]
                 else:
 
@@ -443,9 +759,10 @@ class Field:
             free_tile (tuple): (row, column) of a random free tile.
             occupied_tile (tuple): (row, column) of a random occupied tile.
         """
-        # Indices of free and  occupied tiles
-        free_indices = np.argwhere(self.ground_truth_map == 0)
-        occupied_indices = np.argwhere(self.ground_truth_map == 1)
+        # Indices of free and  occupied tiles (ground truth unpacked once)
+        ground_truth_map = self.ground_truth_map
+        free_indices = np.argwhere(ground_truth_map == 0)
+        occupied_indices = np.argwhere(ground_truth_map == 1)
 
         if len(free_indices) == 0:
             raise ValueError("No free tiles (label 0) found in the ground truth map.")
@@ -474,42 +791,27 @@ class Field:
         observation_matrix = [z_m0, z_m1]
         return observation_matrix
 
-    def _sensor_model(self, true_matrix, altitude):
+    def _sensor_model(self, true_matrix, altitude, N=1, rng=None):
+        """
+        N noisy observations of true_matrix stacked along the rows: each cell
+        is flipped with probability a(1-exp(-bh)), all drawn in one call.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
         sig = self.a * (1 - np.exp(-self.b * altitude))
-        P_z_equals_m = 1 - sig
-        P_z_not_equals_m = sig
 
         rows, cols = true_matrix.shape
-        observation_matrix = np.zeros((rows, cols))
-
-        for i in range(rows):
-            for j in range(cols):
-                if true_matrix[i, j] == 1:
-                    observation_matrix[i, j] = np.random.choice(
-                        [1, 0], p=[P_z_equals_m, P_z_not_equals_m]
-                    )
-                else:
-                    observation_matrix[i, j] = np.random.choice(
-                        [0, 1], p=[P_z_equals_m, P_z_not_equals_m]
-                    )
-
-        return observation_matrix
+        flip = rng.random((N, rows, cols)) < sig
+        observation_matrix = np.where(flip, 1 - true_matrix, true_matrix)
 
-    def _sampler(self, true_matrix, altitude, N, sensor=True):
-        cumulative_observation = np.empty(true_matrix.shape)
-        for i in range(N):
-            if sensor:
-                observation_matrix = self._sensor_model(true_matrix, altitude)
-            else:
-                observation_matrix = self._pred_model(true_matrix, altitude)
+        return observation_matrix.reshape(N * rows, cols).astype(float)
 
-            if i == 0:
-                cumulative_observation = observation_matrix.copy()
-                continue
-            cumulative_observation = np.vstack(
-                [cumulative_observation, observation_matrix]
-            )
-        return cumulative_observation
+    def _sampler(self, true_matrix, altitude, N, sensor=True, rng=None):
+        if sensor:
+            return self._sensor_model(true_matrix, altitude, N=N, rng=rng)
+        return np.array(
+            [self._pred_model(true_matrix, altitude) for _ in range(N)], dtype=float
+        ).reshape(-1, true_matrix.shape[1])
 
     def _calc_n(self, h, e=np.array([0.5, 0.4, 0.3, 0.2, 0.1, 0.05, 0.03])):
         p = self.a * (1 - np.exp(-self.b * h))
@@ -524,10 +826,12 @@ class Field:
             n_per_e[h] = {e: n for e, n in zip(errors, n_values)}
         return n_per_e
 
-    def _get_confusion_matrix(self, altitude, N, sensor=True):
+    def _get_confusion_matrix(self, altitude, N, sensor=True, rng=None):
         true_matrix = np.array([0, 1])
         true_matrix = np.expand_dims(true_matrix, axis=0)
-        observation = self._sampler(true_matrix, altitude, int(N), sensor=sensor)
+        observation = self._sampler(
+            true_matrix, altitude, max(int(N), 1), sensor=sensor, rng=rng
+        )
         n = int(observation.shape[0] / true_matrix.shape[0])
         true_matrix_ = np.tile(true_matrix, (n, 1))
 
@@ -539,15 +843,44 @@ class Field:
         s0, s1 = c[1, 0], c[0, 1]
         return c, (s0, s1)
 
-    def init_s0_s1(self, e=0.3, sensor=True):
+    def _analytic_confusion_matrix(self, altitude):
+        """
+        Limit of _get_confusion_matrix for N -> inf with the symmetric sensor
+        model: s0 = s1 = a(1-exp(-bh)).
+        """
+        sig = self.a * (1 - np.exp(-self.b * altitude))
+        c = np.array([[1 - sig, sig], [sig, 1 - sig]])
+        c = np.clip(np.round(c, 2) + 1e-3, 1e-3, 1)
+
+        s0, s1 = c[1, 0], c[0, 1]
+        return c, (s0, s1)
+
+    def init_s0_s1(self, e=0.3, sensor=True, analytic=False, seed=None):
+        """
+        {altitude: (s0, s1)} estimated from N(altitude, e) simulated
+        observations per altitude (sensor model or CNN predictions), or the
+        exact rates of the sensor model if analytic. Cached per (altitudes, e,
+        seed, sensor, analytic); seed defaults to the field seed.
+        """
+        if seed is None:
+            seed = self.seed
+        key = (tuple(self.altitudes.tolist()), e, seed, sensor, analytic)
+        if key in self.conf_dict_cache:
+            return dict(self.conf_dict_cache[key])
 
+        rng = np.random.default_rng(seed)
         conf_dict = {}
         Ns = self._get_N(self.altitudes)
         for altitude in self.altitudes:
-            conf_dict[altitude] = self._get_confusion_matrix(
-                altitude, Ns[altitude][e], sensor=sensor
-            )[1]
-        return conf_dict
+            if analytic and sensor:
+                conf_dict[altitude] = self._analytic_confusion_matrix(altitude)[1]
+            else:
+                conf_dict[altitude] = self._get_confusion_matrix(
+                    altitude, Ns[altitude][e], sensor=sensor, rng=rng
+                )[1]
+
+        self.conf_dict_cache[key] = conf_dict
+        return dict(conf_dict)
 
 
 # class grid_info:
@@ -1,12 +1,50 @@
 import random
+import time
+
 import numpy as np
 
 # from typing import Dict, List, Tuple, Union
-from helper import uav_position
+from helper import (
+    IGIntegralMap,
+    IGLookupTable,
+    sample_binary_observations,
+    uav_position,
+    validate,
+)
+
+
+class MCTSNode:
+    """
+    Node of the MCTS search tree: the UAV pose x reached by taking action
+    from the parent pose.
+    """
+
+    def __init__(self, x, action=None, parent=None):
+        self.x = x
+        self.action = action
+        self.parent = parent
+        self.children = {}
+        # actions not expanded yet (None until the node is first reached)
+        self.untried = None
+        self.visits = 0
+        self.value = 0.0
 
 
 class planning:
-    def __init__(self, grid_info, uav, strategy, conf_dict=None, optimal_alt=21.6):
+    def __init__(
+        self,
+        grid_info,
+        uav,
+        strategy,
+        conf_dict=None,
+        optimal_alt=21.6,
+        ig_lut_bits=None,
+        horizon=3,
+        time_budget=None,
+        mcts_iterations=1000,
+        mcts_c=1.4,
+        rng=None,
+    ):
         self.M = np.full((grid_info.shape[0], grid_info.shape[1], 2), 0.5)
         self.uav = uav
         self.last_action = None
@@ -14,15 +52,45 @@ class planning:
         self.conf_dict = conf_dict
         self.optimal_altitude = optimal_alt
         self.sweep_direction = None
+        # random generator of the simulated (mexgen) observations
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.ig_map = None
+        # "ig_horizon": lookahead depth, search time budget [s] (None = no limit)
+        # and footprint IG cache keyed by (position, altitude, belief version)
+        if horizon < 1:
+            raise ValueError(f"horizon must be at least 1, got {horizon}")
+        self.horizon = horizon
+        self.time_budget = time_budget
+        self.ig_cache = {}
+        self.planned_actions = []
+        # "mcts": iteration cap (besides time_budget), UCB exploration constant
+        # and the tree kept between steps
+        self.mcts_iterations = mcts_iterations
+        self.mcts_c = mcts_c
+        self.mcts_root = None
+        # quantized H - cH tables (None = exact evaluation)
+        self.ig_lut = None
+        if ig_lut_bits is not None:
+            self.ig_lut = IGLookupTable(self.H, self.cH, bits=ig_lut_bits)
+            if conf_dict is not None:
+                self.ig_lut.precompute(conf_dict.values())
 
     def reset(self, conf_dict=None):
         self.uav.reset()
         self.conf_dict = conf_dict
         self.last_action = None
         self.M = np.ones_like(self.M) * 0.5
+        self.ig_map = None
+        self.ig_cache = {}
+        self.planned_actions = []
+        self.mcts_root = None
+        if self.ig_lut is not None and conf_dict is not None:
+            self.ig_lut.precompute(conf_dict.values())
 
     def info_gain(self, var, x_future, mexgen=False):
-        if mexgen == False:
+        if mexgen == False and self.ig_lut is not None:
+            ig = self.ig_lut(var, self._sigmas(x_future.altitude))
+        elif mexgen == False:
             ig = self.H(var) - self._expected_entropy(var, x_future)
         else:
             # sampled_observation = self.sample_future_observation(5, var, x_future.altitude)
@@ -57,7 +125,8 @@ class planning:
         # entropy = -(var * np.log2(var, where=var > 0.0)
         #       + (1.0 - var) * np.log2((1.0 - var), where=(1.0 - var) > 0.0))
         # Check for NaN values in var
-        assert not np.any(np.isnan(var)), f"NaN detected in var: {var}"
+        if validate("cheap"):
+            assert not np.any(np.isnan(var)), f"NaN detected in var: {var}"
         var = np.clip(var, 0.0, 1.0)  # Clamps values to the range [0, 1]
 
         # assert np.all(np.greater_equal(var, 0.0)), f"{var[np.isnan(var)]}"
@@ -78,12 +147,14 @@ class planning:
         l1 = np.log2(v1)
         l2 = np.log2(v2)
 
-        assert np.all(np.less_equal(l1, 0.0))
-        assert np.all(np.less_equal(l2, 0.0))
+        if validate("full"):
+            assert np.all(np.less_equal(l1, 0.0))
+            assert np.all(np.less_equal(l2, 0.0))
 
         entropy = -(v1 * l1 + v2 * l2)
 
-        assert np.all(np.greater_equal(entropy, 0.0))
+        if validate("full"):
+            assert np.all(np.greater_equal(entropy, 0.0))
 
         return entropy
 
@@ -112,8 +183,9 @@ class planning:
         # p(z = 1) = 1 - p(z = 0)
         b = 1.0 - a + 1e-6
 
-        assert np.all(np.greater_equal(var, 0.0)), f"{var[np.isnan(var)]}"
-        assert np.all(np.less_equal(var, 1.0)), f"{var[np.isnan(var)]}"
+        if validate("cheap"):
+            assert np.all(np.greater_equal(var, 0.0)), f"{var[np.isnan(var)]}"
+            assert np.all(np.less_equal(var, 1.0)), f"{var[np.isnan(var)]}"
 
         # posterior distribution probabilities
         # p(m = 1|z = 0) = (p(z = 0|m = 1)p(m = 1))/p(z = 0)
@@ -121,32 +193,36 @@ class planning:
         # p(m = 1|z = 1) = (p(z = 1|m = 1)p(m = 1))/p(z = 1)
         p11 = ((1.0 - sigma1) * var) / b
 
-        assert np.all(np.greater_equal(np.round(p10, decimals=2), 0.0)) and np.all(
-            np.less_equal(np.round(p10, decimals=2), 1.0)
-        ), f"{p10}"
-        assert np.all(np.greater_equal(p11, 0.0)) and np.all(
-            np.less_equal(p11, 1.0)
-        ), f"{sigma1}-{var[np.greater(p11, 1.0)]}-{b[np.greater(p11, 1.0)]}"
+        if validate("full"):
+            assert np.all(np.greater_equal(np.round(p10, decimals=2), 0.0)) and np.all(
+                np.less_equal(np.round(p10, decimals=2), 1.0)
+            ), f"{p10}"
+            assert np.all(np.greater_equal(p11, 0.0)) and np.all(
+                np.less_equal(p11, 1.0)
+            ), f"{sigma1}-{var[np.greater(p11, 1.0)]}-{b[np.greater(p11, 1.0)]}"
 
         # conditional entropy: average of the entropy of the posterior distribution probabilities
         # H(m|z) = p(z = 0)H(p(m = 1|z = 0)) + p(z = 1)H(p(m = 1|z = 1))
         cH = a * self.H(p10) + b * self.H(p11)
 
-        assert np.all(np.greater_equal(cH, 0.0))
+        if validate("full"):
+            assert np.all(np.greater_equal(cH, 0.0))
 
         return cH
 
-    def _expected_entropy(self, var, x_future):
-        expected_entropy = 0
+    def _sigmas(self, altitude):
         a = 1
         b = 0.015
-        sigma = a * (1 - np.exp(-b * x_future.altitude))
+        sigma = a * (1 - np.exp(-b * altitude))
 
         if self.conf_dict is not None:
-            s0, s1 = self.conf_dict[np.round(x_future.altitude, decimals=2)]
+            s0, s1 = self.conf_dict[np.round(altitude, decimals=2)]
         else:
             s0, s1 = sigma, sigma
+        return s0, s1
 
+    def _expected_entropy(self, var, x_future):
+        s0, s1 = self._sigmas(x_future.altitude)
         expected_entropy = self.cH(var, s0, s1)
 
         return expected_entropy
@@ -226,7 +302,35 @@ class planning:
         # self.last_action = random.choice(sweep_actions)
         return self.last_action, None
 
+    def _batched_info_gain(self, permitted_actions):
+        """
+        Information gain of every candidate action, each footprint total read
+        in O(1) from the integral IG map of the current belief.
+        """
+        info_gain_action = {}
+        for action in permitted_actions:
+            # UAV position after taking action a
+            x_future = uav_position(self.uav.x_future(action))
+            [[obsd_m_i_min, obsd_m_i_max], [obsd_m_j_min, obsd_m_j_max]] = (
+                self.uav.get_range(
+                    position=x_future.position,
+                    altitude=x_future.altitude,
+                    index_form=True,
+                )
+            )
+            info_gain_action[action] = self.ig_map.query(
+                x_future.altitude,
+                obsd_m_i_min,
+                obsd_m_i_max,
+                obsd_m_j_min,
+                obsd_m_j_max,
+            )
+        return info_gain_action
+
     def ig_based(self, permitted_actions, mexgen):
+        if not mexgen:
+            return self._select_max_gain(self._batched_info_gain(permitted_actions))
+
         info_gain_action = {}
         for action in permitted_actions:
             # UAV position after taking action a
@@ -243,12 +347,18 @@ class planning:
             info_gain_action_a = np.sum(self.info_gain(obs_M, x_future, mexgen=mexgen))
             info_gain_action[action] = info_gain_action_a
 
+        return self._select_max_gain(info_gain_action)
+
+    def _select_max_gain(self, info_gain_action):
         # Find the maximum information gain
         max_gain = max(info_gain_action.values())
 
-        # Collect actions with the maximum info gain
+        # Collect actions with the maximum info gain, up to the rounding of the
+        # integral map sums so that equal footprints still tie
         max_gain_actions = [
-            action for action, gain in info_gain_action.items() if gain == max_gain
+            action
+            for action, gain in info_gain_action.items()
+            if np.isclose(gain, max_gain, rtol=1e-9, atol=1e-12)
         ]
 
         next_action = random.choice(max_gain_actions)
@@ -256,6 +366,208 @@ class planning:
         self.last_action = next_action
         return next_action, info_gain_action
 
+    def _pose_IG(self, x):
+        """
+        Total IG of the footprint seen from x on the current belief, memoized.
+        """
+        key = (x.position, x.altitude, self.ig_map.version)
+        if key not in self.ig_cache:
+            [[i_min, i_max], [j_min, j_max]] = self.uav.get_range(
+                position=x.position, altitude=x.altitude, index_form=True
+            )
+            self.ig_cache[key] = self.ig_map.query(
+                x.altitude, i_min, i_max, j_min, j_max
+            )
+        return self.ig_cache[key]
+
+    def _successors(self, x, successors):
+        """
+        {next pose: action} reachable from x in one step (the first action
+        found for each distinct pose), memoized in successors.
+        """
+        if x not in successors:
+            successors[x] = {}
+            for action in sorted(self.uav.permitted_actions(x)):
+                x_next = uav_position(self.uav.x_future(action, x=x))
+                successors[x].setdefault(x_next, action)
+        return successors[x]
+
+    def receding_horizon(self):
+        """
+        Depth-N lookahead: the action sequence with the largest total IG over
+        the next self.horizon steps, a pose visited twice in the sequence
+        counting once. Depth-first branch and bound: children are expanded in
+        decreasing IG order and a branch is pruned when its IG plus an upper
+        bound of the remaining steps (the best footprint IG reachable at each
+        depth, read from the integral IG map) cannot beat the best sequence.
+        The search stops at self.time_budget seconds with the best sequence
+        so far; only its first action is executed.
+
+        Returns:
+            next action, {first action: best sequence IG found}
+        """
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.perf_counter() + self.time_budget
+
+        # drop the footprint IG of previous belief versions
+        version = self.ig_map.version
+        self.ig_cache = {
+            key: ig for key, ig in self.ig_cache.items() if key[2] == version
+        }
+
+        root = uav_position((self.uav.get_x().position, self.uav.get_x().altitude))
+        successors = {}
+
+        # upper bound of the IG collected at depth k: best pose within k steps
+        reachable, best_ig = {root}, []
+        for _ in range(self.horizon):
+            for x in list(reachable):
+                reachable.update(self._successors(x, successors))
+            best_ig.append(max(self._pose_IG(x) for x in reachable))
+        bound_to_go = np.cumsum(best_ig[::-1])[::-1].tolist() + [0.0]
+
+        best = {"value": -np.inf, "plan": None}
+        plan_value = {}
+
+        def expand(x, depth, value, plan, seen):
+            timeout = deadline is not None and time.perf_counter() > deadline
+            if depth == self.horizon or (timeout and plan):
+                plan_value[plan[0]] = max(plan_value.get(plan[0], -np.inf), value)
+                if value > best["value"]:
+                    best["value"], best["plan"] = value, plan
+                return
+            if value + bound_to_go[depth] <= best["value"]:
+                return
+
+            children = [
+                (0.0 if x_next in seen else self._pose_IG(x_next), action, x_next)
+                for x_next, action in self._successors(x, successors).items()
+            ]
+            children.sort(key=lambda child: -child[0])
+            for reward, action, x_next in children:
+                expand(
+                    x_next, depth + 1, value + reward, plan + [action], seen | {x_next}
+                )
+
+        expand(root, 0, 0.0, [], frozenset())
+
+        self.planned_actions = best["plan"]
+        self.last_action = best["plan"][0]
+        return self.last_action, plan_value
+
+    def _mcts_reward(self, x, seen):
+        """
+        IG of the footprint seen from x estimated from simulated observations
+        (sample_binary_observations); 0 if x was already visited on the path.
+        """
+        if x in seen:
+            return 0.0
+        [[i_min, i_max], [j_min, j_max]] = self.uav.get_range(
+            position=x.position, altitude=x.altitude, index_form=True
+        )
+        obs_M = self.M[i_min:i_max, j_min:j_max, 1]
+        if obs_M.size == 0:
+            return 0.0
+        return self.info_gain(obs_M, x, mexgen=True)
+
+    def _mcts_select(self, node, scale):
+        # UCB1 with the returns normalized by the largest one seen
+        log_visits = np.log(node.visits)
+        return max(
+            node.children.values(),
+            key=lambda child: child.value / child.visits / scale
+            + self.mcts_c * np.sqrt(log_visits / child.visits),
+        )
+
+    def mcts(self):
+        """
+        Monte-Carlo tree search over the next self.horizon steps: UCB1
+        selection, one expansion per iteration, then a random rollout; the
+        return of an iteration is the IG collected along the path, each
+        footprint IG estimated from simulated observations. Runs until
+        self.time_budget seconds or self.mcts_iterations iterations, whichever
+        comes first. The subtree of the executed action is kept as the root of
+        the next search.
+
+        Returns:
+            most visited action, {action: mean return}
+        """
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.perf_counter() + self.time_budget
+
+        x_root = uav_position((self.uav.get_x().position, self.uav.get_x().altitude))
+        root = None
+        if self.mcts_root is not None and self.last_action in self.mcts_root.children:
+            root = self.mcts_root.children[self.last_action]
+            root = root if root.x == x_root else None
+        if root is None:
+            root = MCTSNode(x_root)
+        root.parent = None
+        self.mcts_root = root
+
+        successors = {}
+        scale = max(
+            [child.value / child.visits for child in root.children.values()] + [1e-9]
+        )
+        iteration = 0
+        # at least one iteration, so that the root has a child
+        while iteration < self.mcts_iterations and (
+            iteration == 0 or deadline is None or time.perf_counter() < deadline
+        ):
+            iteration += 1
+            node, seen, rewards = root, frozenset(), []
+
+            # selection
+            while node.untried == [] and len(rewards) < self.horizon:
+                node = self._mcts_select(node, scale)
+                rewards.append(self._mcts_reward(node.x, seen))
+                seen = seen | {node.x}
+
+            # expansion
+            if len(rewards) < self.horizon:
+                if node.untried is None:
+                    node.untried = [
+                        (action, x_next)
+                        for x_next, action in self._successors(
+                            node.x, successors
+                        ).items()
+                    ]
+                    random.shuffle(node.untried)
+                action, x_next = node.untried.pop()
+                node.children[action] = MCTSNode(x_next, action, node)
+                node = node.children[action]
+                rewards.append(self._mcts_reward(node.x, seen))
+                seen = seen | {node.x}
+
+            # rollout
+            x = node.x
+            rollout_return = 0.0
+            for _ in range(len(rewards), self.horizon):
+                x = random.choice(list(self._successors(x, successors)))
+                rollout_return += self._mcts_reward(x, seen)
+                seen = seen | {x}
+
+            # backpropagation of the return collected from each node of the path
+            to_go = rollout_return
+            for reward in reversed(rewards):
+                to_go += reward
+                node.visits += 1
+                node.value += to_go
+                node = node.parent
+            root.visits += 1
+            scale = max(scale, to_go)
+
+        info_gain_action = {
+            action: child.value / child.visits
+            for action, child in root.children.items()
+        }
+        self.last_action = max(
+            root.children, key=lambda action: root.children[action].visits
+        )
+        return self.last_action, info_gain_action
+
     def compute_future_entropy(
         self, prior: np.ndarray, sampled_observation: np.ndarray
     ) -> float:
@@ -293,6 +605,19 @@ class planning:
 
     def select_action(self, belief, visited_x):
         self.M = belief
+        # the integral IG map is only read by ig (without mexgen) and
+        # ig_horizon: mcts rewards come from info_gain(mexgen=True)
+        if self.strategy not in ("sweep", "ig_with_mexgen", "mcts"):
+            if self.ig_map is None:
+                self.ig_map = IGIntegralMap(
+                    self.M[:, :, 1],
+                    self.H,
+                    self.cH,
+                    conf_dict=self.conf_dict,
+                    lut=self.ig_lut,
+                )
+            else:
+                self.ig_map.update(self.M[:, :, 1])
 
         permitted_actions = self.uav.permitted_actions(self.uav)  # at UAV position x
         # if self.strategy == "random":
@@ -300,6 +625,11 @@ class planning:
         if self.strategy == "sweep":
             return self.sweep(permitted_actions, visited_x)
 
+        if self.strategy == "ig_horizon":
+            return self.receding_horizon()
+        if self.strategy == "mcts":
+            return self.mcts()
+
         # IG based IPP strategy
         if self.strategy == "ig_with_mexgen":
             mexgen = True
@@ -309,33 +639,9 @@ class planning:
 
     def sample_binary_observations(self, belief_map, altitude, num_samples=5):
         """
-        Samples binary observations from a belief map with noise based on altitude.
-
-        Args:
-            belief_map (np.ndarray): Belief map of shape (m, n, 2), where belief_map[..., 1] is P(m=1).
-            altitude (float): UAV altitude affecting noise level.
-            num_samples (int): Number of samples for averaging.
-            noise_factor (float): Base noise factor scaled with altitude.
-
-        Returns:
-            np.ndarray: Averaged binary observation map of shape (m, n).
+        Averaged simulated binary observations of belief_map (P(m=1)) from
+        altitude, see helper.sample_binary_observations.
         """
-        m, n = belief_map.shape
-        sampled_observations = np.zeros((m, n, num_samples))
-        a = 0.2
-        b = 0.05
-        var = a * (1 - np.exp(-b * altitude))
-        noise_std = np.sqrt(var)
-        # noise_std = noise_factor * altitude  # Noise increases with altitude
-
-        for i in range(num_samples):
-            # Sample from the probability map with added Gaussian noise
-            noise = np.random.normal(loc=0.0, scale=noise_std, size=(m, n))
-            noisy_prob = belief_map + noise  # Add noise to P(m=1)
-            noisy_prob = np.clip(noisy_prob, 0, 1)  # Ensure probabilities are valid
-
-            # Sample binary observation
-            sampled_observations[..., i] = np.random.binomial(1, noisy_prob)
-
-        # Return the averaged observation map
-        return np.mean(sampled_observations, axis=-1)
+        return sample_binary_observations(
+            belief_map, altitude, num_samples=num_samples, rng=self.rng
+        )
@@ -0,0 +1,82 @@
+"""
+int8 post-training static quantization of the tile classifier: calibrates
+on a random sample of orthomap tiles, exports the quantized TorchScript for
+Predicter(backend="int8", exported_model_path=...) and reports accuracy, AUC
+and tiles/sec of the float and int8 models against the annotation labels, on
+tiles not used for calibration.
+
+    python quantize_classifier.py [n_calibration] [n_eval] [out_dir]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from sklearn.metrics import roc_auc_score
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from binary_classifier.classifier import Predicter, model_path
+from binary_classifier.dataloader import WheatOthomapDataset
+from orthomap import annotation_path, dataset_path, tile_ortomappixel_path
+
+
+def batches(dataset, indices, batch_size=64):
+    for start in range(0, len(indices), batch_size):
+        data, targets = zip(*(dataset[i] for i in indices[start : start + batch_size]))
+        yield torch.stack(data), torch.stack(targets).argmax(dim=1)
+
+
+def evaluate(predicter, dataset, indices):
+    """
+    (accuracy, AUC, tiles/sec) of predicter on the dataset tiles at indices.
+    """
+    predicter.model.eval()
+    labels, preds, scores = [], [], []
+    elapsed = 0.0
+    with torch.inference_mode():
+        for data, targets in batches(dataset, indices):
+            start = time.perf_counter()
+            outputs = predicter.model(data)
+            elapsed += time.perf_counter() - start
+            probs = torch.sigmoid(outputs)
+            labels.append(targets.numpy())
+            # first class whose probability is over 0.5, as Predicter.predict()
+            preds.append(torch.argmax((probs > 0.5).int(), dim=1).numpy())
+            scores.append(probs[:, 1].numpy())
+    labels, preds, scores = map(np.concatenate, (labels, preds, scores))
+    accuracy = np.mean(preds == labels)
+    auc = roc_auc_score(labels, scores) if len(np.unique(labels)) > 1 else np.nan
+    return accuracy, auc, len(indices) / elapsed
+
+
+def main(n_calibration=256, n_eval=1024, out_dir="models"):
+    dataset = WheatOthomapDataset(dataset_path, annotation_path, tile_ortomappixel_path)
+    indices = np.random.default_rng(0).permutation(len(dataset))
+    calibration = indices[:n_calibration]
+    held_out = indices[n_calibration : n_calibration + n_eval]
+
+    predicter = Predicter(model_weights_path=model_path, num_classes=2)
+    float_metrics = evaluate(predicter, dataset, held_out)
+
+    predicter.quantize(data for data, _ in batches(dataset, calibration))
+    int8_metrics = evaluate(predicter, dataset, held_out)
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    script_path, _ = predicter.export(out_dir, name=name)
+
+    print(f"{len(calibration)} calibration tiles, {len(held_out)} evaluation tiles")
+    for label, (accuracy, auc, rate) in (
+        ("float", float_metrics),
+        ("int8", int8_metrics),
+    ):
+        print(f"{label:5s}: accuracy {accuracy:.4f}, AUC {auc:.4f}, {rate:.1f} tiles/s")
+    print(
+        f"AUC drop {float_metrics[1] - int8_metrics[1]:.4f}, "
+        f"speedup {int8_metrics[2] / float_metrics[2]:.2f}x, exported {script_path}"
+    )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(*[int(a) for a in args[:2]], *args[2:3])
@@ -0,0 +1,111 @@
+import os
+
+import numpy as np
+import pytest
+
+from helper import (
+    BitMap,
+    atomic_write,
+    clipped_normal_mean,
+    gaussian_random_field,
+    gaussian_random_field_bank,
+    sample_binary_observations,
+)
+
+
+@pytest.mark.parametrize("n_cols", [1, 7, 8, 13, 16, 21])
+def test_bitmap_round_trip(n_cols):
+    values = np.random.default_rng(n_cols).integers(0, 2, (5, n_cols), dtype=np.uint8)
+    bm = BitMap.from_array(values)
+
+    np.testing.assert_array_equal(bm.to_array(), values)
+    np.testing.assert_array_equal(np.asarray(bm), values)
+    for i in range(-5, 5):
+        np.testing.assert_array_equal(bm[i], values[i])
+        for j in range(-n_cols, n_cols):
+            assert bm[i, j] == values[i, j]
+    np.testing.assert_array_equal(bm[1:4, [0, -1]], values[1:4, [0, -1]])
+    for cols in [
+        slice(None),
+        slice(2, None),
+        slice(-3, None),
+        slice(None, -1),
+        slice(1, 100),
+        slice(-100, 3),
+        slice(4, 2),
+        slice(None, None, 2),
+    ]:
+        np.testing.assert_array_equal(bm[:, cols], values[:, cols])
+        np.testing.assert_array_equal(bm[-2:, cols], values[-2:, cols])
+
+
+@pytest.mark.parametrize("n_cols", [5, 8, 13])
+def test_bitmap_out_of_range(n_cols):
+    bm = BitMap.from_array(np.ones((3, n_cols), dtype=np.uint8))
+    for index in [(0, n_cols), (0, -n_cols - 1), (3, 0), (-4, 0), 3]:
+        with pytest.raises(IndexError):
+            bm[index]
+
+
+def test_atomic_write(tmp_path):
+    path = tmp_path / "data.npy"
+    with atomic_write(str(path)) as tmp, open(tmp, "wb") as f:
+        np.save(f, np.arange(3))
+    np.testing.assert_array_equal(np.load(path), np.arange(3))
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path)) as tmp, open(tmp, "wb") as f:
+            np.save(f, np.arange(5))
+            raise RuntimeError
+    # the failed write neither replaced path nor left its temporary file
+    np.testing.assert_array_equal(np.load(path), np.arange(3))
+    assert [p.name for p in tmp_path.iterdir()] == ["data.npy"]
+
+
+def test_field_bank_parameters(tmp_path):
+    path = str(tmp_path / "bank.npy")
+    bank = gaussian_random_field_bank(path, 2.0, (32, 40), [1, 2])
+    np.testing.assert_array_equal(bank[1], gaussian_random_field(2.0, (32, 40), 2))
+    # same shape, other parameters: rebuilt
+    for cluster_radius, seeds in [(3.0, [1, 2]), (3.0, [1, 5])]:
+        bank = gaussian_random_field_bank(path, cluster_radius, (32, 40), seeds)
+        for k, seed in enumerate(seeds):
+            np.testing.assert_array_equal(
+                bank[k], gaussian_random_field(cluster_radius, (32, 40), seed)
+            )
+    mtime = os.path.getmtime(path)
+    gaussian_random_field_bank(path, 3.0, (32, 40), [1, 5])
+    assert os.path.getmtime(path) == mtime
+
+
+@pytest.mark.parametrize("noise_std", [0.0, 0.05, 0.3, 1.0])
+def test_clipped_normal_mean(noise_std):
+    p = np.array([-0.2, 0.0, 0.05, 0.3, 0.5, 0.9, 1.0, 1.3])
+    noise = np.random.default_rng(0).normal(0.0, noise_std, (400_000, 1))
+    monte_carlo = np.mean(np.clip(p + noise, 0.0, 1.0), axis=0)
+    # standard error below 0.5 / sqrt(400_000) < 1e-3
+    np.testing.assert_allclose(
+        clipped_normal_mean(p, noise_std), monte_carlo, atol=5e-3
+    )
+
+
+def test_sample_binary_observations():
+    belief = np.array([[0.0, 0.1, 0.5], [0.7, 0.95, 1.0]])
+    altitude, num_samples = 20.0, 100_000
+
+    # the sampling it replaces: clipped noisy probability, then one draw, for
+    # each of the num_samples samples
+    rng = np.random.default_rng(0)
+    noise_std = np.sqrt(0.2 * (1 - np.exp(-0.05 * altitude)))
+    noise = rng.normal(0.0, noise_std, (num_samples, *belief.shape))
+    reference = np.mean(rng.binomial(1, np.clip(belief + noise, 0, 1)), axis=0)
+
+    observations = sample_binary_observations(
+        belief, altitude, num_samples, rng=np.random.default_rng(1)
+    )
+    # two averages of num_samples Bernoulli draws: standard error < 2.3e-3
+    np.testing.assert_allclose(observations, reference, atol=0.012)
+
+    first = sample_binary_observations(belief, altitude, 5, np.random.default_rng(7))
+    again = sample_binary_observations(belief, altitude, 5, np.random.default_rng(7))
+    np.testing.assert_array_equal(first, again)
@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from mapper_LBP import OccupancyMap
+
+N = (12, 15)
+# footprints (rows, cols), inside the grid and on each of its borders
+FOOTPRINTS = [
+    ((3, 8), (4, 11)),
+    ((0, 5), (0, 6)),
+    ((7, 12), (9, 15)),
+    ((0, 12), (2, 9)),
+    ((2, 10), (0, 15)),
+]
+
+
+def reference_propagate(occ_map, fp_vertices_ij, max_iterations, warm_start=False):
+    """
+    LBP loop as first written (new arrays for every product and message),
+    on the msgs and map_beliefs of occ_map.
+    """
+    psi = occ_map.pairwise_potential()
+    if not warm_start:
+        occ_map.msgs = np.ones_like(occ_map.msgs) * 0.5
+        occ_map.msgs_buffer = np.ones_like(occ_map.msgs) * 0.5
+    occ_map.msgs[4, :, :] = occ_map.map_beliefs[:, :]
+    for _ in range(max_iterations):
+        for data in occ_map.direction_to_slicing_data.values():
+            product_slice = data["product_slice"](fp_vertices_ij)
+            read_slice = data["read_slice"](fp_vertices_ij)
+            write_slice = data["write_slice"](fp_vertices_ij)
+
+            mul_0 = np.prod(1 - occ_map.msgs[product_slice], axis=0)
+            mul_1 = np.prod(occ_map.msgs[product_slice], axis=0)
+            msg_0 = psi[0, 0] * mul_0 + psi[0, 1] * mul_1
+            msg_1 = psi[1, 0] * mul_0 + psi[1, 1] * mul_1
+            occ_map.msgs_buffer[write_slice] = (msg_1 / (msg_0 + msg_1))[read_slice]
+        occ_map.msgs[:4, :, :] = occ_map.msgs_buffer[:4, :, :]
+
+    bel_0 = np.prod(1 - occ_map.msgs[:, product_slice[1], product_slice[2]], axis=0)
+    bel_1 = np.prod(occ_map.msgs[:, product_slice[1], product_slice[2]], axis=0)
+    occ_map.map_beliefs[product_slice[1], product_slice[2]] = bel_1 / (bel_0 + bel_1)
+
+
+def steps(seed=0):
+    """
+    (fp_vertices_ij, z, uav_pos) of a few mapping steps over FOOTPRINTS.
+    """
+    rng = np.random.default_rng(seed)
+    occ_map = OccupancyMap(N)
+    for k, ((i_min, i_max), (j_min, j_max)) in enumerate(FOOTPRINTS):
+        fp_vertices_ij = occ_map.get_indices(
+            np.arange(i_min, i_max), np.arange(j_min, j_max)
+        )
+        z = rng.integers(0, 2, (i_max - i_min, j_max - j_min))
+        yield fp_vertices_ij, z, SimpleNamespace(altitude=10.0 + 5 * k)
+
+
+@pytest.mark.parametrize("max_iterations", [1, 3])
+def test_sweep_matches_reference(max_iterations):
+    occ_map = OccupancyMap(N, correlation_type="biased")
+    reference = OccupancyMap(N, correlation_type="biased")
+    for fp_vertices_ij, z, uav_pos in steps():
+        occ_map.update_belief_OG(fp_vertices_ij, z, uav_pos)
+        occ_map.propagate_messages_(
+            fp_vertices_ij, z, uav_pos, max_iterations=max_iterations
+        )
+        reference.update_belief_OG(fp_vertices_ij, z, uav_pos)
+        reference_propagate(reference, fp_vertices_ij, max_iterations)
+
+        assert np.array_equal(occ_map.map_beliefs, reference.map_beliefs)
+        assert np.array_equal(occ_map.msgs[:4], reference.msgs[:4])
+
+
+def test_warm_start_matches_reference():
+    occ_map = OccupancyMap(N, correlation_type="biased")
+    reference = OccupancyMap(N, correlation_type="biased")
+    for fp_vertices_ij, z, uav_pos in steps():
+        occ_map.update_belief_OG(fp_vertices_ij, z, uav_pos)
+        occ_map.propagate_messages_(
+            fp_vertices_ij, z, uav_pos, max_iterations=2, warm_start=True
+        )
+        reference.update_belief_OG(fp_vertices_ij, z, uav_pos)
+        reference_propagate(reference, fp_vertices_ij, 2, warm_start=True)
+
+        assert np.array_equal(occ_map.map_beliefs, reference.map_beliefs)
+        assert np.array_equal(occ_map.msgs[:4], reference.msgs[:4])
+
+
+def test_tol_stops_at_reference_sweeps():
+    occ_map = OccupancyMap(N, correlation_type="biased")
+    reference = OccupancyMap(N, correlation_type="biased")
+    for fp_vertices_ij, z, uav_pos in steps():
+        occ_map.update_belief_OG(fp_vertices_ij, z, uav_pos)
+        n_iterations = occ_map.propagate_messages_(
+            fp_vertices_ij, z, uav_pos, max_iterations=100, tol=1e-6
+        )
+        assert n_iterations == occ_map.n_iterations < 100
+        assert occ_map.residual < 1e-6
+
+        reference.update_belief_OG(fp_vertices_ij, z, uav_pos)
+        reference_propagate(reference, fp_vertices_ij, n_iterations)
+        assert np.array_equal(occ_map.map_beliefs, reference.map_beliefs)
+
+
+@pytest.mark.parametrize("max_iterations", [1, 3])
+def test_log_odds_matches_reference(max_iterations):
+    occ_map = OccupancyMap(N, correlation_type="biased", log_odds=True)
+    reference = OccupancyMap(N, correlation_type="biased")
+    for fp_vertices_ij, z, uav_pos in steps():
+        occ_map.update_belief_OG(fp_vertices_ij, z, uav_pos)
+        occ_map.propagate_messages_(
+            fp_vertices_ij, z, uav_pos, max_iterations=max_iterations
+        )
+        reference.update_belief_OG(fp_vertices_ij, z, uav_pos)
+        reference_propagate(reference, fp_vertices_ij, max_iterations)
+
+        np.testing.assert_allclose(
+            occ_map.get_belief(), reference.map_beliefs, rtol=0, atol=1e-12
+        )
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+pytest.importorskip("cv2")
+pytest.importorskip("osgeo")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from orthomap import Field, img_sampler
+
+
+@pytest.mark.parametrize("alt", [None, 19.5, 26.1, 39.3, 52.5])
+@pytest.mark.parametrize("out_size", [None, 224])
+def test_batch_at_alt_matches_pil(alt, out_size):
+    """
+    batch_at_alt against img_at_alt and the bilinear resize of
+    transforms.Resize done per tile with PIL, which rounds to uint8 after
+    each step and blurs with box passes: within 1 grey level on average.
+    """
+    if alt is None and out_size is None:
+        pytest.skip("identity")
+    sampler = img_sampler()
+    tiles = np.random.default_rng(0).integers(0, 256, (4, 189, 189, 3), np.uint8)
+
+    expected = []
+    for tile in tiles:
+        image = Image.fromarray(tile)
+        if alt is not None:
+            image = sampler.img_at_alt(image, alt)
+        if out_size is not None:
+            image = image.resize((out_size, out_size), Image.BILINEAR)
+        expected.append(np.moveaxis(np.asarray(image), -1, 0))
+    expected = np.stack(expected).astype(np.float32)
+
+    degraded = sampler.batch_at_alt(tiles, alt, out_size)
+    assert degraded.shape == expected.shape
+    assert np.mean(np.abs(degraded - expected)) < 1.0
+
+
+def test_sensor_model():
+    field = Field.__new__(Field)
+    field.a, field.b = 1, 0.015
+    true_matrix = np.array([[0, 1]])
+    altitude, n = 30.0, 200_000
+    sigma = field.a * (1 - np.exp(-field.b * altitude))
+
+    observations = field._sensor_model(
+        true_matrix, altitude, N=n, rng=np.random.default_rng(0)
+    )
+    assert observations.shape == (n, 2)
+    # flip rate of each true value, standard error < 1.2e-3
+    flips = np.mean(observations != true_matrix, axis=0)
+    np.testing.assert_allclose(flips, sigma, atol=6e-3)
+
+    again = field._sensor_model(
+        true_matrix, altitude, N=n, rng=np.random.default_rng(0)
+    )
+    np.testing.assert_array_equal(observations, again)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+import planner as planner_module
+from helper import IGIntegralMap
+from planner import planning
+from uav_camera import camera
+
+
+class grid_info:
+    x = 50
+    y = 50
+    length = 0.125
+    shape = (int(y / length), int(x / length))
+    center = True
+
+
+def tie_set(planner, info_gain_action, monkeypatch):
+    # actions random.choice picks from in _select_max_gain
+    chosen = {}
+
+    def choice(actions):
+        chosen["actions"] = list(actions)
+        return actions[0]
+
+    monkeypatch.setattr(planner_module.random, "choice", choice)
+    planner._select_max_gain(info_gain_action)
+    return set(chosen["actions"])
+
+
+def test_equal_footprints_tie(monkeypatch):
+    """
+    Footprints of the same size on a uniform belief have equal IG: all must
+    stay in the tie set despite the rounding of the integral map sums.
+    """
+    belief = np.full(grid_info.shape, 0.5)
+    planner = planning(grid_info, None, "ig")
+    ig_map = IGIntegralMap(belief, planner.H, planner.cH)
+
+    size = 40
+    gains = {
+        (i, j): ig_map.query(21.6, i, i + size, j, j + size)
+        for i in range(0, grid_info.shape[0] - size, 17)
+        for j in range(0, grid_info.shape[1] - size, 17)
+    }
+    assert tie_set(planner, gains, monkeypatch) == set(gains)
+
+
+def test_select_action_ties_as_exact_sums(monkeypatch):
+    """
+    At step 0 (uniform belief) the actions tied by select_action are those
+    whose exact footprint IG sums tie.
+    """
+    uav = camera(grid_info, 60, camera_altitude=5.4)
+    planner = planning(grid_info, uav, "ig")
+    belief = np.full((*grid_info.shape, 2), 0.5)
+
+    _, info_gain_action = planner.select_action(belief, [])
+    exact = {}
+    for action in uav.permitted_actions(uav):
+        x_future = planner_module.uav_position(uav.x_future(action))
+        [[i_min, i_max], [j_min, j_max]] = uav.get_range(
+            position=x_future.position, altitude=x_future.altitude, index_form=True
+        )
+        var = belief[i_min:i_max, j_min:j_max, 1]
+        exact[action] = np.sum(
+            planner.H(var) - planner._expected_entropy(var, x_future)
+        )
+    max_exact = max(exact.values())
+
+    expected = {action for action, gain in exact.items() if gain == max_exact}
+    assert tie_set(planner, info_gain_action, monkeypatch) == expected
+
+
+def test_horizon_must_be_positive():
+    with pytest.raises(ValueError):
+        planning(grid_info, None, "ig_horizon", horizon=0)
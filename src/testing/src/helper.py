@@ -254,10 +254,17 @@ class FastLogger:
 
 
 import os
-import pickle
+import sys
 
+# grf_amplitude and FieldCache of src/helper.py (imported as src.helper, this
+# module being helper in the testing tree)
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+)
+from src.helper import GRF_THRESHOLD, FieldCache, grf_amplitude
 
-def gaussian_random_field(cluster_radius, n_cell, cache_dir="cache"):
+
+def gaussian_random_field(cluster_radius, n_cell, cache_dir=None):
     """
     Generate a 2D Gaussian random field and cache the results for reuse.
      https://andrewwalker.github.io/statefultransitions/post/gaussian-fields/
@@ -265,67 +272,50 @@ def gaussian_random_field(cluster_radius, n_cell, cache_dir="cache"):
     - cluster_radius: Correlation radius for the Gaussian field.
     - n_cell: Size of the field (n_cell_x x n_cell_y).
 
-    - cache_dir: Directory to store cached fields (default: "cache").
+    - cache_dir: Directory to store cached fields (default: None, no cache).
 
     Returns:
     - 2D binary random field as a numpy array.
     """
 
-    # Ensure cache directory exists
-    os.makedirs(cache_dir, exist_ok=True)
     n_cell_x, n_cell_y = n_cell
 
-    # Generate cache filename
-    cache_file = os.path.join(
-        cache_dir, f"field_radius_{cluster_radius}_size_{n_cell_x}x{n_cell_y}.pkl"
-    )
+    # Try loading from cache
+    cache, key = None, None
+    if cache_dir is not None:
+        cache = FieldCache(cache_dir)
+        key = FieldCache.key(
+            generator="gaussian_random_field",
+            cluster_radius=float(cluster_radius),
+            shape=(int(n_cell_x), int(n_cell_y)),
+            seed=123,
+            threshold=GRF_THRESHOLD,
+        )
+        binary_field = cache.load(key, (n_cell_x, n_cell_y))
+        if binary_field is not None:
+            return binary_field
 
-    # # Try loading from cache
-    # if os.path.exists(cache_file):
-    #     with open(cache_file, "rb") as f:
-    #         # print(f"Loading cached field from {cache_file}")
-    #         return pickle.load(f)
-
-    # Helper functions
-    def _fft_indices(n):
-        a = list(range(0, int(np.floor(n / 2)) + 1))
-        b = reversed(range(1, int(np.floor(n / 2))))
-        b = [-i for i in b]
-        return a + b
-
-    def _pk2(kx, ky):
-        if kx == 0 and ky == 0:
-            return 0.0
-        val = np.sqrt(np.sqrt(kx**2 + ky**2) ** (-cluster_radius))
-        return val
-
-    # Generate amplitude for the given cluster_radius
     map_rng = np.random.default_rng(123)
-    amplitude = np.zeros((n_cell_x, n_cell_y))
-    fft_indices_x = _fft_indices(n_cell_x)
-    fft_indices_y = _fft_indices(n_cell_y)
-
-    for i, kx in enumerate(fft_indices_x):
-        for j, ky in enumerate(fft_indices_y):
-            amplitude[i, j] = _pk2(kx, ky)
 
     # Generate Gaussian random field
-    noise = np.fft.fft2(map_rng.normal(size=(n_cell_x, n_cell_y)))
-    random_field = np.fft.ifft2(noise * amplitude).real
+    noise = np.fft.rfft2(map_rng.normal(size=(n_cell_x, n_cell_y)))
+    random_field = np.fft.irfft2(
+        noise * grf_amplitude(cluster_radius, (n_cell_x, n_cell_y)),
+        s=(n_cell_x, n_cell_y),
+    )
     normalized_random_field = (random_field - np.min(random_field)) / (
         np.max(random_field) - np.min(random_field)
     )
 
     # Make field binary
-    normalized_random_field[normalized_random_field >= 0.5] = 1
-    normalized_random_field[normalized_random_field < 0.5] = 0
+    normalized_random_field[normalized_random_field >= GRF_THRESHOLD] = 1
+    normalized_random_field[normalized_random_field < GRF_THRESHOLD] = 0
 
     binary_field = normalized_random_field.astype(np.uint8)
 
     # Save to cache
-    # with open(cache_file, "wb") as f:
-    #     pickle.dump(binary_field, f)
-    # # print(f"Field generated and saved to {cache_file}")
+    if cache is not None:
+        cache.store(key, binary_field)
 
     return binary_field
 
@@ -374,37 +364,22 @@ def sigma(altitude):
     return a * (1 - np.exp(-b * altitude))
 
 
-def sensor_model(true_matrix, altitude):
+def sensor_model(true_matrix, altitude, N=1):
+    """
+    N noisy observations of true_matrix stacked along the rows: each cell is
+    flipped with probability sigma(altitude), all drawn in one call.
+    """
     sig = sigma(altitude)
-    P_z_equals_m = 1 - sig
-    P_z_not_equals_m = sig
 
     rows, cols = true_matrix.shape
-    observation_matrix = np.zeros((rows, cols))
-
-    for i in range(rows):
-        for j in range(cols):
-            if true_matrix[i, j] == 1:
-                observation_matrix[i, j] = np.random.choice(
-                    [1, 0], p=[P_z_equals_m, P_z_not_equals_m]
-                )
-            else:
-                observation_matrix[i, j] = np.random.choice(
-                    [0, 1], p=[P_z_equals_m, P_z_not_equals_m]
-                )
+    flip = np.random.random((N, rows, cols)) < sig
+    observation_matrix = np.where(flip, 1 - true_matrix, true_matrix)
 
-    return observation_matrix
+    return observation_matrix.reshape(N * rows, cols).astype(float)
 
 
 def sampler(true_matrix, altitude, N):
-    cumulative_observation = np.empty(true_matrix.shape)
-    for i in range(N):
-        observation_matrix = sensor_model(true_matrix, altitude)
-        if i == 0:
-            cumulative_observation = observation_matrix.copy()
-            continue
-        cumulative_observation = np.vstack([cumulative_observation, observation_matrix])
-    return cumulative_observation
+    return sensor_model(true_matrix, altitude, N=max(N, 1))
 
 
 def calc_n(h, e=np.array([0.5, 0.4, 0.3, 0.2, 0.1, 0.05, 0.03])):
@@ -1,3 +1,5 @@
+import os
+import sys
 import time
 import numpy as np
 import copy
@@ -9,6 +11,17 @@ import mpl_toolkits.mplot3d.art3d as art3d
 from matplotlib.path import Path
 import pyglet
 
+# src/helper.py and src/lbp_workspace.py (imported as src.*, helper being the
+# testing copy here): IG integral map, LBP workspace and GRF amplitudes shared
+# with the planner, and one validation level (src.helper.set_validation_level()
+# or ACTIVE_SENSING_VALIDATION) for the checks of this module and src/helper.py
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+)
+from src import helper as src_helper
+from src.helper import grf_amplitude, validate
+from src.lbp_workspace import LBPWorkspace
+
 np.set_printoptions(floatmode="fixed")
 
 X, Y, Z = 0, 1, 2
@@ -41,8 +54,9 @@ def H(var: [np.ndarray, float]) -> [np.ndarray, float]:
     # entropy = -(var * np.log2(var, where=var > 0.0)
     #       + (1.0 - var) * np.log2((1.0 - var), where=(1.0 - var) > 0.0))
 
-    assert np.all(np.greater_equal(var, 0.0)), f"{var[np.isnan(var)]}"
-    assert np.all(np.less_equal(var, 1.0)), f"{var[np.isnan(var)]}"
+    if validate("cheap"):
+        assert np.all(np.greater_equal(var, 0.0)), f"{var[np.isnan(var)]}"
+        assert np.all(np.less_equal(var, 1.0)), f"{var[np.isnan(var)]}"
 
     v1 = var
     v2 = 1.0 - var
@@ -59,12 +73,14 @@ def H(var: [np.ndarray, float]) -> [np.ndarray, float]:
     l1 = np.log2(v1)
     l2 = np.log2(v2)
 
-    assert np.all(np.less_equal(l1, 0.0))
-    assert np.all(np.less_equal(l2, 0.0))
+    if validate("full"):
+        assert np.all(np.less_equal(l1, 0.0))
+        assert np.all(np.less_equal(l2, 0.0))
 
     entropy = -(v1 * l1 + v2 * l2)
 
-    assert np.all(np.greater_equal(entropy, 0.0))
+    if validate("full"):
+        assert np.all(np.greater_equal(entropy, 0.0))
 
     return entropy
 
@@ -92,8 +108,9 @@ def cH(var: np.ndarray, sigma0: float, sigma1: float) -> np.ndarray:
     # p(z = 1) = 1 - p(z = 0)
     b = 1.0 - a
 
-    assert np.all(np.greater_equal(var, 0.0)), f"{var[np.isnan(var)]}"
-    assert np.all(np.less_equal(var, 1.0)), f"{var[np.isnan(var)]}"
+    if validate("cheap"):
+        assert np.all(np.greater_equal(var, 0.0)), f"{var[np.isnan(var)]}"
+        assert np.all(np.less_equal(var, 1.0)), f"{var[np.isnan(var)]}"
 
     # posterior distribution probabilities
     # p(m = 1|z = 0) = (p(z = 0|m = 1)p(m = 1))/p(z = 0)
@@ -101,18 +118,20 @@ def cH(var: np.ndarray, sigma0: float, sigma1: float) -> np.ndarray:
     # p(m = 1|z = 1) = (p(z = 1|m = 1)p(m = 1))/p(z = 1)
     p11 = ((1.0 - sigma1) * var) / b
 
-    assert np.all(np.greater_equal(p10, 0.0)) and np.all(
-        np.less_equal(p10, 1.0)
-    ), f"{p10}"
-    assert np.all(np.greater_equal(p11, 0.0)) and np.all(
-        np.less_equal(p11, 1.0)
-    ), f"{sigma1}-{var[np.greater(p11, 1.0)]}-{b[np.greater(p11, 1.0)]}"
+    if validate("full"):
+        assert np.all(np.greater_equal(p10, 0.0)) and np.all(
+            np.less_equal(p10, 1.0)
+        ), f"{p10}"
+        assert np.all(np.greater_equal(p11, 0.0)) and np.all(
+            np.less_equal(p11, 1.0)
+        ), f"{sigma1}-{var[np.greater(p11, 1.0)]}-{b[np.greater(p11, 1.0)]}"
 
     # conditional entropy: average of the entropy of the posterior distribution probabilities
     # H(m|z) = p(z = 0)H(p(m = 1|z = 0)) + p(z = 1)H(p(m = 1|z = 1))
     cH = a * H(p10) + b * H(p11)
 
-    assert np.all(np.greater_equal(cH, 0.0))
+    if validate("full"):
+        assert np.all(np.greater_equal(cH, 0.0))
 
     return cH
 
@@ -738,7 +757,6 @@ class MappingEnv:
             self.cluster_radius = kwargs.get("cluster_radius", 1)
         self.mul = kwargs.get("mul", 1)
         self.patch_pos = kwargs.get("patch_pos")
-        self.cluster_radius_to_amplitude = {}  # container for generate_grf
 
         # environment rng map ground truth
         self.map_rng = np.random.default_rng(123)
@@ -1017,36 +1035,13 @@ class MappingEnv:
         """Generate 2D gaussian random field:
         https://andrewwalker.github.io/statefultransitions/post/gaussian-fields/"""
 
-        def _fft_indices(n) -> List:
-            a = list(range(0, int(np.floor(n / 2)) + 1))
-            b = reversed(range(1, int(np.floor(n / 2))))
-            b = [-i for i in b]
-            return a + b
-
-        def _pk2(kx, ky):
-            if kx == 0 and ky == 0:
-                return 0.0
-            val = np.sqrt(np.sqrt(kx**2 + ky**2) ** (-cluster_radius))
-            return val
-
-        # memoization of amplitude (amplitude depends on n_cell, fft_indices, cluster_radius)
-        # there is a one-to-one mapping between cluster_radius and amplitude
-        # for each cluster_radius, what makes the maps different is just the noise
-        if cluster_radius not in self.cluster_radius_to_amplitude:
-
-            amplitude = np.zeros((self.n_cell, self.n_cell))
-            fft_indices = _fft_indices(self.n_cell)
-
-            for i, kx in enumerate(fft_indices):
-                for j, ky in enumerate(fft_indices):
-                    amplitude[i, j] = _pk2(kx, ky)
-
-            self.cluster_radius_to_amplitude[cluster_radius] = np.copy(amplitude)
-
-        noise = np.fft.fft2(self.map_rng.normal(size=(self.n_cell, self.n_cell)))
-        random_field = np.fft.ifft2(
-            noise * self.cluster_radius_to_amplitude[cluster_radius]
-        ).real
+        # the amplitude depends on cluster_radius and n_cell only: for each
+        # cluster_radius, what makes the maps different is just the noise
+        shape = (self.n_cell, self.n_cell)
+        noise = np.fft.rfft2(self.map_rng.normal(size=shape))
+        random_field = np.fft.irfft2(
+            noise * grf_amplitude(cluster_radius, shape), s=shape
+        )
         normalized_random_field = (random_field - np.min(random_field)) / (
             np.max(random_field) - np.min(random_field)
         )
@@ -1203,8 +1198,8 @@ class Mapper:
             self.graph[k]["msgs"] = np.ones_like(v["msgs"])
 
     def reset_msgs_vectorized(self):
-        self.msgs = np.ones_like(self.msgs) * 0.5
-        self.msgs_buffer = np.ones_like(self.msgs) * 0.5
+        self.msgs.fill(0.5)
+        self.msgs_buffer.fill(0.5)
 
     def update_belief_OG(self, observations: List[Dict], agents: List[Agent]):
 
@@ -1238,16 +1233,18 @@ class Mapper:
                     a.id,
                 ]
             )
-            assert np.all(np.greater_equal(posterior_m_one, 0.0))
+            if validate("full"):
+                assert np.all(np.greater_equal(posterior_m_one, 0.0))
 
             # posterior_m_zero_norm = posterior_m_zero / (posterior_m_zero + posterior_m_one)
             posterior_m_one_norm = posterior_m_one / (
                 posterior_m_zero + posterior_m_one
             )
 
-            assert np.all(np.greater_equal(posterior_m_one_norm, 0.0)) and np.all(
-                np.less_equal(posterior_m_one_norm, 1.0)
-            )
+            if validate("cheap"):
+                assert np.all(np.greater_equal(posterior_m_one_norm, 0.0)) and np.all(
+                    np.less_equal(posterior_m_one_norm, 1.0)
+                )
 
             if self.centralized:
                 map_beliefs[
@@ -1309,6 +1306,7 @@ class Mapper:
         # depth_to_direction = 0123_4 -> URDL_fake
         self.msgs = np.ones((4 + 1, n_cell, n_cell), dtype=float) * 0.5
         self.msgs_buffer = np.ones_like(self.msgs) * 0.5
+        self.workspace = LBPWorkspace((n_cell, n_cell))
 
         # self.pairwise_potential = np.array([[0.7, 0.3], [0.3, 0.7]], dtype=float)
 
@@ -1558,63 +1556,30 @@ class Mapper:
         for o, agent in zip(observations, agents):
 
             # reset msgs and msgs_buffer
-            self.msgs = np.ones_like(self.msgs) * 0.5
-            self.msgs_buffer = np.ones_like(self.msgs) * 0.5
-            self.msgs[4, :, :] = map_beliefs[
-                :, :, agent.id
-            ]  # set msgs last channel with current map belief
-            agent.pairwise_potential = np.round(agent.pairwise_potential, decimals=10)
+            self.msgs.fill(0.5)
+            self.msgs_buffer.fill(0.5)
             fp_vertices_ij = o["fp_ij"]
+            rows, cols = self.workspace.footprint(fp_vertices_ij)
+            # set msgs last channel with current map belief
+            np.copyto(self.msgs[4, rows, cols], map_beliefs[rows, cols, agent.id])
+            agent.pairwise_potential = np.round(agent.pairwise_potential, decimals=10)
             for _ in range(n_iteration):
-                for direction, data in self.direction_to_slicing_data.items():
-                    product_slice = data["product_slice"](fp_vertices_ij)
-                    read_slice = data["read_slice"](fp_vertices_ij)
-                    write_slice = data["write_slice"](fp_vertices_ij)
-
-                    # elementwise multiplication of msgs
-                    mul_0 = np.prod(1 - self.msgs[product_slice], axis=0)
-                    mul_1 = np.prod(self.msgs[product_slice], axis=0)
-
-                    # matrix-vector multiplication (factor-msg)
-                    msg_0 = (
-                        agent.pairwise_potential[0, 0] * mul_0
-                        + agent.pairwise_potential[0, 1] * mul_1
-                    )
-                    msg_1 = (
-                        agent.pairwise_potential[1, 0] * mul_0
-                        + agent.pairwise_potential[1, 1] * mul_1
-                    )
-
-                    # normalize the first coordinate of the msg
-                    norm_msg_1 = msg_1 / (msg_0 + msg_1)
-
-                    # buffering
-                    self.msgs_buffer[write_slice] = norm_msg_1[read_slice]
-
-                # copy the first 4 channels only
-                # the 5th one is the map belief
-                self.msgs[:4, :, :] = self.msgs_buffer[:4, :, :]
-                # return self.msgs[:4,:,:]
-
-            bel_0 = np.prod(
-                1 - self.msgs[:, product_slice[1], product_slice[2]], axis=0
-            )
-            bel_1 = np.prod(self.msgs[:, product_slice[1], product_slice[2]], axis=0)
+                self.workspace.sweep(
+                    self.msgs,
+                    self.msgs_buffer,
+                    agent.pairwise_potential,
+                    fp_vertices_ij,
+                    self.direction_to_slicing_data,
+                )
 
-            # norm_bel_0 = bel_0 / (bel_0 + bel_1)
-            map_beliefs[product_slice[1], product_slice[2], agent.id] = bel_1 / (
-                bel_0 + bel_1
+            self.workspace.belief(
+                self.msgs, fp_vertices_ij, out=map_beliefs[rows, cols, agent.id]
             )
 
-            assert np.all(
-                np.greater_equal(
-                    map_beliefs[product_slice[1], product_slice[2], agent.id], 0.0
-                )
-            ) and np.all(
-                np.less_equal(
-                    map_beliefs[product_slice[1], product_slice[2], agent.id], 1.0
-                )
-            )
+            if validate("cheap"):
+                assert np.all(
+                    np.greater_equal(map_beliefs[rows, cols, agent.id], 0.0)
+                ) and np.all(np.less_equal(map_beliefs[rows, cols, agent.id], 1.0))
 
     def get_msgs(self):
         return self.msgs[:4, :, :]
@@ -1657,15 +1622,17 @@ class Mapper:
                 ]
             )
 
-            assert np.all(np.greater_equal(posterior_m_one, 0.0))
+            if validate("full"):
+                assert np.all(np.greater_equal(posterior_m_one, 0.0))
 
             posterior_m_one_norm = posterior_m_one / (
                 posterior_m_zero + posterior_m_one
             )
 
-            assert np.all(np.greater_equal(posterior_m_one_norm, 0.0)) and np.all(
-                np.less_equal(posterior_m_one_norm, 1.0)
-            )
+            if validate("cheap"):
+                assert np.all(np.greater_equal(posterior_m_one_norm, 0.0)) and np.all(
+                    np.less_equal(posterior_m_one_norm, 1.0)
+                )
 
             news_map_beliefs[
                 agent_id,
@@ -1677,74 +1644,42 @@ class Mapper:
         for agent_id in range(len(agents)):
 
             # reset msgs and msgs_buffer
-            self.msgs = np.ones_like(self.msgs) * 0.5
-            self.msgs_buffer = np.ones_like(self.msgs) * 0.5
-            self.msgs[4, :, :] = news_map_beliefs[
-                agent_id, agent_id, :, :
-            ]  # set msgs last channel with current map belief
-
+            self.msgs.fill(0.5)
+            self.msgs_buffer.fill(0.5)
             fp_vertices_ij = observations[agent_id]["fp_ij"]
+            rows, cols = self.workspace.footprint(fp_vertices_ij)
+            # set msgs last channel with current map belief
+            np.copyto(
+                self.msgs[4, rows, cols],
+                news_map_beliefs[agent_id, agent_id, rows, cols],
+            )
+            agents[agent_id].pairwise_potential = np.round(
+                agents[agent_id].pairwise_potential, decimals=10
+            )
 
             # just 1 iteration
-            for direction, data in self.direction_to_slicing_data.items():
-                product_slice = data["product_slice"](fp_vertices_ij)
-                read_slice = data["read_slice"](fp_vertices_ij)
-                write_slice = data["write_slice"](fp_vertices_ij)
-
-                # elementwise multiplication of msgs
-                mul_0 = np.prod(1 - self.msgs[product_slice], axis=0)
-                mul_1 = np.prod(self.msgs[product_slice], axis=0)
-                agents[agent_id].pairwise_potential = np.round(
-                    agents[agent_id].pairwise_potential, decimals=10
-                )
-
-                # matrix-vector multiplication (factor-msg)
-                msg_0 = (
-                    agents[agent_id].pairwise_potential[0, 0] * mul_0
-                    + agents[agent_id].pairwise_potential[0, 1] * mul_1
-                )
-                msg_1 = (
-                    agents[agent_id].pairwise_potential[1, 0] * mul_0
-                    + agents[agent_id].pairwise_potential[1, 1] * mul_1
-                )
-
-                # normalize the first coordinate of the msg
-                norm_msg_1 = msg_1 / (msg_0 + msg_1)
-
-                # buffering
-                # self.msgs_buffer[write_slice] =  np.round(norm_msg_1[read_slice], decimals=10)
-
-                self.msgs_buffer[write_slice] = norm_msg_1[read_slice]
-
-            # copy the first 4 channels only
-            # the 5th one is the map belief
-            self.msgs[:4, :, :] = self.msgs_buffer[:4, :, :]
-
-            bel_0 = np.prod(
-                1 - self.msgs[:, product_slice[1], product_slice[2]], axis=0
+            self.workspace.sweep(
+                self.msgs,
+                self.msgs_buffer,
+                agents[agent_id].pairwise_potential,
+                fp_vertices_ij,
+                self.direction_to_slicing_data,
             )
-            bel_1 = np.prod(self.msgs[:, product_slice[1], product_slice[2]], axis=0)
 
-            # norm_bel_0 = bel_0 / (bel_0 + bel_1)
-            news_map_beliefs[agent_id, agent_id, product_slice[1], product_slice[2]] = (
-                bel_1 / (bel_0 + bel_1)
+            self.workspace.belief(
+                self.msgs,
+                fp_vertices_ij,
+                out=news_map_beliefs[agent_id, agent_id, rows, cols],
             )
 
-            assert np.all(
-                np.greater_equal(
-                    news_map_beliefs[
-                        agent_id, agent_id, product_slice[1], product_slice[2]
-                    ],
-                    0.0,
-                )
-            ) and np.all(
-                np.less_equal(
-                    news_map_beliefs[
-                        agent_id, agent_id, product_slice[1], product_slice[2]
-                    ],
-                    1.0,
+            if validate("cheap"):
+                assert np.all(
+                    np.greater_equal(
+                        news_map_beliefs[agent_id, agent_id, rows, cols], 0.0
+                    )
+                ) and np.all(
+                    np.less_equal(news_map_beliefs[agent_id, agent_id, rows, cols], 1.0)
                 )
-            )
 
         for agent_id in range(len(agents)):
 
@@ -1763,14 +1698,38 @@ class Mapper:
                     * (1.0 - map_beliefs[:, :, neighbor_id])
                 )
 
-                assert np.all(
-                    np.greater_equal(map_beliefs[:, :, neighbor_id], 0.0)
-                ) and np.all(np.less_equal(map_beliefs[:, :, neighbor_id], 1.0))
+                if validate("cheap"):
+                    assert np.all(
+                        np.greater_equal(map_beliefs[:, :, neighbor_id], 0.0)
+                    ) and np.all(np.less_equal(map_beliefs[:, :, neighbor_id], 1.0))
 
             if len(neighbors_ids) != 0:
                 news_map_beliefs[agent_id, agent_id, :, :] = 0.5
 
 
+class IGIntegralMap(src_helper.IGIntegralMap):
+    """
+    src/helper.py IGIntegralMap on the simulator's H and cH, the per-cell IG
+    being zeroed where H and cH are numerically equal as in the Planner
+    footprint loops.
+
+    Args:
+        belief: P(m=1) map of shape (n_rows, n_cols).
+        conf_dict, a, b: see src/helper.py IGIntegralMap.
+    """
+
+    def __init__(self, belief, conf_dict=None, a=1, b=0.015):
+        super().__init__(belief, H, cH, conf_dict=conf_dict, a=a, b=b)
+
+    def cell_ig(self, var, sigmas):
+        current_H, current_cH = H(var), cH(var, *sigmas)
+        diff = current_H - current_cH
+        diff = np.where(np.isclose(current_H, current_cH), 0.0, diff)
+        if validate("full"):
+            assert np.all(np.greater_equal(diff, 0.0))
+        return diff
+
+
 class Planner:
     def __init__(
         self,
@@ -1831,6 +1790,9 @@ class Planner:
         self.z_buffer = np.ones((400, 400), dtype=float)
         self.n_buffer = np.zeros((400, 400), dtype=int)
 
+        # _non_targeted_mini* integral IG map of each agent map belief
+        self.ig_maps: Dict[int, IGIntegralMap] = {}
+
     def get_actions(self, agents: List[Agent], observations: List[Dict]):
 
         if self.planner_type == "selfish":
@@ -1993,12 +1955,13 @@ class Planner:
                     # assert non-negativity
                     diff = current_H - current_cH
                     diff = np.where(np.isclose(current_H, current_cH), 0.0, diff)
-                    assert np.all(np.greater_equal(diff, 0.0)), (
-                        f"{position}"
-                        f"{action}"
-                        f"{current_H[np.less(diff, 0.0)]}"
-                        f"{fp_map_belief[np.less(diff, 0.0)]}"
-                    )
+                    if validate("full"):
+                        assert np.all(np.greater_equal(diff, 0.0)), (
+                            f"{position}"
+                            f"{action}"
+                            f"{current_H[np.less(diff, 0.0)]}"
+                            f"{fp_map_belief[np.less(diff, 0.0)]}"
+                        )
 
                     admissible_action_to_IG[action] = [
                         # np.round(np.sum(diff) / cost, 8),
@@ -2034,8 +1997,8 @@ class Planner:
 
     def _non_targeted_mini(self, agents: List[Agent]):
 
-        global map_beliefs, map_belief_entropies
         actions, data = [], []
+        self._update_ig_maps(agents)
 
         for agent in agents:
 
@@ -2052,43 +2015,15 @@ class Planner:
 
             for action, position in future_action_position.items():
 
-                fp_vertices_ij, _ = agent.camera.get_fp_vertices_ij(position)
-
-                fp_map_belief = map_beliefs[
-                    fp_vertices_ij["ul"][I] : fp_vertices_ij["bl"][I],
-                    fp_vertices_ij["ul"][J] : fp_vertices_ij["ur"][J],
-                    agent.id,
-                ]
-
-                # H(M_fp) - entropy of the prior = sum of the entropy of each cell in the footprint
-                current_H = map_belief_entropies[
-                    fp_vertices_ij["ul"][I] : fp_vertices_ij["bl"][I],
-                    fp_vertices_ij["ul"][J] : fp_vertices_ij["ur"][J],
-                    agent.id,
-                ]
-
-                # H(M_fp|Z) - conditional entropy of the posterior = sum of the averaged entropy of each cell in the footprint
-                sigma0, sigma1 = agent.camera.get_sigmas(position)
-                current_cH = cH(fp_map_belief, np.round(sigma0, 7), np.round(sigma1, 7))
-                # print(f"L: {action} current entropy: {np.sum(current_H)}")
-                # print(
-                #     f"L: {action}: obsd : {fp_vertices_ij['ul'][I]}:{fp_vertices_ij['bl'][I]},{fp_vertices_ij['ul'][J]}:{fp_vertices_ij['ur'][J]}"
-                # )
-                # print(f"L: {action} exptected entropy: {np.sum(current_cH)}")
-
-                # assert non-negativity
-                diff = current_H - current_cH
-                diff = np.where(np.isclose(current_H, current_cH), 0.0, diff)
-                assert np.all(np.greater_equal(diff, 0.0)), (
-                    f"{position}"
-                    f"{action}"
-                    f"{current_H[np.less(diff, 0.0)]}"
-                    f"{fp_map_belief[np.less(diff, 0.0)]}"
+                # H(M_fp) - H(M_fp|Z): sum over the footprint of the entropy of
+                # the prior minus the averaged entropy of the posterior
+                fp_vertices_ij, IG = self._footprint_IG(
+                    agent.id, agent.camera, position
                 )
 
                 admissible_action_to_IG[action] = [
                     # np.round(np.sum(diff) / cost, 8),
-                    np.sum(diff)
+                    IG
                 ]
 
                 admissible_action_to_fp_ij[action] = fp_vertices_ij
@@ -2145,34 +2080,9 @@ class Planner:
 
                 for action, position in future_action_position.items():
 
-                    fp_vertices_ij, _ = neighbor.camera.get_fp_vertices_ij(position)
-
-                    # H(M_fp) - entropy of the prior = sum of the entropy of each cell in the footprint
-                    current_H = map_belief_entropies[
-                        fp_vertices_ij["ul"][I] : fp_vertices_ij["bl"][I],
-                        fp_vertices_ij["ul"][J] : fp_vertices_ij["ur"][J],
-                        agent.id,
-                    ]
-
-                    # H(M_fp|Z) - conditional entropy of the posterior = sum of the averaged entropy of each cell in the footprint
-                    sigma0, sigma1 = neighbor.camera.get_sigmas(position)
-                    fp_map_belief = map_beliefs[
-                        fp_vertices_ij["ul"][I] : fp_vertices_ij["bl"][I],
-                        fp_vertices_ij["ul"][J] : fp_vertices_ij["ur"][J],
-                        agent.id,
-                    ]
-                    current_cH = cH(
-                        fp_map_belief, np.round(sigma0, 7), np.round(sigma1, 7)
-                    )
-
-                    # assert non-negativity
-                    diff = current_H - current_cH
-                    diff = np.where(np.isclose(current_H, current_cH), 0.0, diff)
-                    assert np.all(np.greater_equal(diff, 0.0)), (
-                        f"{position}"
-                        f"{action}"
-                        f"{current_H[np.less(diff, 0.0)]}"
-                        f"{fp_map_belief[np.less(diff, 0.0)]}"
+                    # IG of the neighbor footprint on this agent map belief
+                    fp_vertices_ij, IG = self._footprint_IG(
+                        agent.id, neighbor.camera, position
                     )
 
                     # alpha = 1.0
@@ -2180,7 +2090,7 @@ class Planner:
                     #     if agent.id != index:
                     #         alpha *= (1.0 - IoU(fp_vertices_ij, fp_neighbor_ij))
 
-                    admissible_action_to_IG[action] = [np.sum(diff)]
+                    admissible_action_to_IG[action] = [IG]
                     admissible_action_to_fp_ij[action] = fp_vertices_ij
 
                 neighbor_action = self.__argmin_action(
@@ -2535,7 +2445,8 @@ class Planner:
                 diff = current_H - current_cH
                 diff = np.where(np.isclose(current_H, current_cH), 0.0, diff)
                 diff *= cells_weights
-                assert np.all(np.greater_equal(diff, 0.0))
+                if validate("full"):
+                    assert np.all(np.greater_equal(diff, 0.0))
 
                 admissible_action_to_IG[agent_action] = [
                     # np.round(np.sum(diff) / cost, 8),
@@ -2655,7 +2566,8 @@ class Planner:
                 diff = current_H - current_cH
                 diff = np.where(np.isclose(current_H, current_cH), 0.0, diff)
                 diff *= cells_weights
-                assert np.all(np.greater_equal(diff, 0.0))
+                if validate("full"):
+                    assert np.all(np.greater_equal(diff, 0.0))
 
                 admissible_action_to_IG[agent_action] = [
                     # np.round(np.sum(diff) / cost, 8),
@@ -2794,6 +2706,31 @@ class Planner:
     #
     #     return actions
 
+    def _update_ig_maps(self, agents: List[Agent]):
+        global map_beliefs
+
+        for agent in agents:
+            if agent.id not in self.ig_maps:
+                self.ig_maps[agent.id] = IGIntegralMap(map_beliefs[:, :, agent.id])
+            else:
+                self.ig_maps[agent.id].update(map_beliefs[:, :, agent.id])
+
+    def _footprint_IG(self, agent_id: int, camera: Camera, position) -> Tuple:
+        """
+        Footprint seen by camera from position and its total IG on the map
+        belief of agent_id.
+        """
+        fp_vertices_ij, _ = camera.get_fp_vertices_ij(position)
+        sigma0, sigma1 = camera.get_sigmas(position)
+        return fp_vertices_ij, self.ig_maps[agent_id].query(
+            position[Z],
+            fp_vertices_ij["ul"][I],
+            fp_vertices_ij["bl"][I],
+            fp_vertices_ij["ul"][J],
+            fp_vertices_ij["ur"][J],
+            sigmas=(np.round(sigma0, 7), np.round(sigma1, 7)),
+        )
+
     def compute_map_belief_entropies(self):
         global map_beliefs, map_belief_entropies
 
@@ -2969,6 +2906,7 @@ class Communication:
         # depth_to_direction = 0123_4 -> URDL_fake
         self.msgs = np.ones((4 + 1, n_cell, n_cell), dtype=float) * 0.5
         self.msgs_buffer = np.ones_like(self.msgs) * 0.5
+        self.workspace = LBPWorkspace((n_cell, n_cell))
 
         self.pairwise_potential = np.array([[0.7, 0.3], [0.3, 0.7]], dtype=float)
 
@@ -3162,22 +3100,25 @@ class Communication:
                     likelihood_m_zero *= msg["likelihood_m_zero"]
                     likelihood_m_one *= msg["likelihood_m_one"]
 
-                assert np.all(np.not_equal(likelihood_m_zero, 0.0))
-                assert np.all(np.not_equal(likelihood_m_one, 0.0))
+                if validate("full"):
+                    assert np.all(np.not_equal(likelihood_m_zero, 0.0))
+                    assert np.all(np.not_equal(likelihood_m_one, 0.0))
 
                 posterior_m_zero = likelihood_m_zero * (1.0 - a.map_belief)
                 posterior_m_one = likelihood_m_one * a.map_belief
 
-                assert np.all(np.greater_equal(posterior_m_one, 0.0))
+                if validate("full"):
+                    assert np.all(np.greater_equal(posterior_m_one, 0.0))
 
                 # posterior_m_zero_norm = posterior_m_zero / (posterior_m_zero + posterior_m_one)
                 posterior_m_one_norm = posterior_m_one / (
                     posterior_m_zero + posterior_m_one
                 )
 
-                assert np.all(np.greater_equal(posterior_m_one_norm, 0.0)) and np.all(
-                    np.less_equal(posterior_m_one_norm, 1.0)
-                )
+                if validate("cheap"):
+                    assert np.all(
+                        np.greater_equal(posterior_m_one_norm, 0.0)
+                    ) and np.all(np.less_equal(posterior_m_one_norm, 1.0))
 
                 a.map_belief = np.copy(posterior_m_one_norm)
 
@@ -3187,8 +3128,8 @@ class Communication:
         for a in agents:
             if len(a.msg_cache) != 0:
                 # reset msgs and msgs_buffer
-                self.msgs = np.ones_like(self.msgs) * 0.5
-                self.msgs_buffer = np.ones_like(self.msgs) * 0.5
+                self.msgs.fill(0.5)
+                self.msgs_buffer.fill(0.5)
                 self.msgs[4, :, :] = (
                     a.map_belief
                 )  # set msgs last channel with current map belief
@@ -3202,54 +3143,20 @@ class Communication:
                 }
 
                 for _ in range(n_iteration):
-                    for direction, data in self.direction_to_slicing_data.items():
-                        product_slice = data["product_slice"](fp_vertices_ij)
-                        read_slice = data["read_slice"](fp_vertices_ij)
-                        write_slice = data["write_slice"](fp_vertices_ij)
-
-                        # elementwise multiplication of msgs
-                        mul_0 = np.prod(1 - self.msgs[product_slice], axis=0)
-                        mul_1 = np.prod(self.msgs[product_slice], axis=0)
-
-                        # matrix-vector multiplication (factor-msg)
-                        msg_0 = (
-                            self.pairwise_potential[0, 0] * mul_0
-                            + self.pairwise_potential[0, 1] * mul_1
-                        )
-                        msg_1 = (
-                            self.pairwise_potential[1, 0] * mul_0
-                            + self.pairwise_potential[1, 1] * mul_1
-                        )
-
-                        # normalize the first coordinate of the msg
-                        norm_msg_1 = msg_1 / (msg_0 + msg_1)
-
-                        # buffering
-                        self.msgs_buffer[write_slice] = norm_msg_1[read_slice]
-
-                    # copy the first 4 channels only
-                    # the 5th one is the map belief
-                    self.msgs[:4, :, :] = self.msgs_buffer[:4, :, :]
-
-                bel_0 = np.prod(
-                    1 - self.msgs[:, product_slice[1], product_slice[2]], axis=0
-                )
-                bel_1 = np.prod(
-                    self.msgs[:, product_slice[1], product_slice[2]], axis=0
-                )
+                    self.workspace.sweep(
+                        self.msgs,
+                        self.msgs_buffer,
+                        self.pairwise_potential,
+                        fp_vertices_ij,
+                        self.direction_to_slicing_data,
+                    )
 
-                # norm_bel_0 = bel_0 / (bel_0 + bel_1)
-                a.map_belief[product_slice[1], product_slice[2]] = bel_1 / (
-                    bel_0 + bel_1
-                )
+                self.workspace.belief(self.msgs, fp_vertices_ij, out=a.map_belief)
 
-                assert np.all(
-                    np.greater_equal(
-                        a.map_belief[product_slice[1], product_slice[2]], 0.0
+                if validate("cheap"):
+                    assert np.all(np.greater_equal(a.map_belief, 0.0)) and np.all(
+                        np.less_equal(a.map_belief, 1.0)
                     )
-                ) and np.all(
-                    np.less_equal(a.map_belief[product_slice[1], product_slice[2]], 1.0)
-                )
 
     def fuse_belief(self, observations: List[Dict], agents: List[Agent]):
         if self.fusion_type == "naive":
@@ -3375,7 +3282,8 @@ class Tree:
         # assert non-negativity
         diff = current_H - current_cH
         diff = np.where(np.isclose(current_H, current_cH), 0.0, diff)
-        assert np.all(np.greater_equal(diff, 0.0))
+        if validate("full"):
+            assert np.all(np.greater_equal(diff, 0.0))
 
         ig = np.sum(diff)
 
@@ -2,7 +2,7 @@ import math
 import numpy as np
 
 # from helper import id_converter, sample_event_matrix,
-from helper import uav_position
+from helper import noisy_observations, uav_position
 
 # from terrain_creation import terrain
 
@@ -149,12 +149,7 @@ class camera:
         sigma0, sigma1 = sigmas[0], sigmas[1]
 
         # rng = np.random.default_rng()
-        random_values = self.rng.random(submap.shape)
-        success0 = random_values <= 1.0 - sigma0
-        success1 = random_values <= 1.0 - sigma1
-        z0 = np.where(np.logical_and(success0, submap == 0), 0, 1)
-        z1 = np.where(np.logical_and(success1, submap == 1), 1, 0)
-        z = np.where(submap == 0, z0, z1)
+        z = noisy_observations(submap, sigma0, sigma1, self.rng)
 
         # x, y = np.meshgrid(x, y, indexing="ij")
         fp_vertices_ij = {